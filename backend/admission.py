@@ -0,0 +1,282 @@
+"""
+Admission control for the expensive endpoints.
+
+Expensive routes are assigned to a named pool with a concurrency cap and a
+bounded, priority-ordered wait queue. When a pool is saturated, requests fail
+fast with ``503`` and ``Retry-After`` instead of piling up in the threadpool
+that cheap lookups such as ``/api/properties`` also need. An optional
+per-client token bucket per pool answers ``429``. Routes that are not
+assigned to a pool pass straight through.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+# Lower rank is served first when a slot frees up.
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+# Fraction of a pool's wait queue each priority may fill, so a flood of
+# low-priority work still leaves queue room for normal requests.
+QUEUE_SHARE = {"high": 1.0, "normal": 1.0, "low": 0.5}
+SHED_REASONS = ("queue_full", "queue_timeout", "rate_limited")
+
+_EWMA_ALPHA = 0.2
+_MAX_TRACKED_CLIENTS = 10_000
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    max_concurrent: int
+    max_queue: int
+    queue_timeout: float = 2.0
+    # Requests per second per client; 0 disables rate limiting.
+    client_rate: float = 0.0
+    client_burst: int = 10
+
+    @classmethod
+    def from_env(cls, name: str, **defaults: Any) -> "PoolConfig":
+        """Read ``ADMISSION_<NAME>_CONCURRENCY``, ``_QUEUE``, ``_QUEUE_TIMEOUT``, ``_CLIENT_RATE`` and ``_CLIENT_BURST``."""
+        prefix = f"ADMISSION_{name.upper()}_"
+        fields = {
+            "CONCURRENCY": ("max_concurrent", int),
+            "QUEUE": ("max_queue", int),
+            "QUEUE_TIMEOUT": ("queue_timeout", float),
+            "CLIENT_RATE": ("client_rate", float),
+            "CLIENT_BURST": ("client_burst", int),
+        }
+        overrides = {
+            field: parse(os.environ[prefix + suffix])
+            for suffix, (field, parse) in fields.items()
+            if os.getenv(prefix + suffix)
+        }
+        return replace(cls(**defaults), **overrides)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend one token. Returns 0 on success, else seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """Token bucket per client, keeping only the most recently seen clients."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = _MAX_TRACKED_CLIENTS) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, client: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket.take(now)
+
+
+class ConcurrencyLimiter:
+    """
+    At most ``max_concurrent`` holders; up to ``max_queue`` waiters ordered by
+    priority, then arrival. A released slot is handed straight to the next
+    waiter. Runs on the event loop and is not thread-safe.
+    """
+
+    def __init__(self, config: PoolConfig) -> None:
+        self.config = config
+        self.active = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {reason: 0 for reason in SHED_REASONS}
+        self.queued_by_priority: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self.hold_seconds = 0.0
+        self._waiters: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(self.queued_by_priority.values())
+
+    def retry_after(self) -> int:
+        """Rough seconds until the queue ahead of a new request would drain."""
+        estimate = self.hold_seconds * (self.queued + 1) / self.config.max_concurrent
+        return max(1, math.ceil(estimate))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.shed[reason] += 1
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self, priority: str = "normal") -> None:
+        if self.active < self.config.max_concurrent and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.queued >= int(self.config.max_queue * QUEUE_SHARE[priority]):
+            raise self._reject("queue_full")
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._sequence), future))
+        self.queued_by_priority[priority] += 1
+        try:
+            await asyncio.wait_for(future, self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout") from None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the client went away.
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self.queued_by_priority[priority] -= 1
+        self.admitted += 1
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        if held_seconds is not None:
+            self.hold_seconds += _EWMA_ALPHA * (held_seconds - self.hold_seconds)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxConcurrent": self.config.max_concurrent,
+            "maxQueue": self.config.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "queuedByPriority": dict(self.queued_by_priority),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "avgHoldMs": round(self.hold_seconds * 1000, 2),
+        }
+
+
+class _Pool:
+    def __init__(self, config: PoolConfig) -> None:
+        self.limiter = ConcurrencyLimiter(config)
+        self.rate_limiter = (
+            ClientRateLimiter(config.client_rate, config.client_burst) if config.client_rate > 0 else None
+        )
+
+
+class AdmissionController:
+    """
+    ``routes`` maps ``(method, path)`` to ``(pool, priority)``. Only exact
+    paths are matched, which is all the expensive endpoints need.
+
+    Behind ``trusted_proxies`` reverse proxies, each of which appends the
+    address it saw to ``X-Forwarded-For``, the client is the entry that many
+    places from the right; entries further left are client-controlled.
+    """
+
+    def __init__(
+        self,
+        pools: Mapping[str, PoolConfig],
+        routes: Mapping[Tuple[str, str], Tuple[str, str]],
+        *,
+        trusted_proxies: int = 0,
+    ) -> None:
+        for pool, priority in routes.values():
+            if pool not in pools or priority not in PRIORITIES:
+                raise ValueError(f"Unknown admission pool or priority: {pool}/{priority}")
+        self.pools = {name: _Pool(config) for name, config in pools.items()}
+        self.routes = dict(routes)
+        self.trusted_proxies = trusted_proxies
+
+    def client_key(self, scope: Scope) -> str:
+        if self.trusted_proxies > 0:
+            forwarded = [
+                entry.strip()
+                for name, value in scope.get("headers", ())
+                if name == b"x-forwarded-for"
+                for entry in value.decode("latin-1").split(",")
+            ]
+            forwarded = [entry for entry in forwarded if entry]
+            if forwarded:
+                return forwarded[max(0, len(forwarded) - self.trusted_proxies)]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: pool.limiter.stats() for name, pool in self.pools.items()}
+
+
+def _rejection(status_code: int, message: str, retry_after: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": message},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+class AdmissionMiddleware:
+    """ASGI middleware; a slot is held until the response body is fully sent."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = self.controller.routes.get((scope.get("method", ""), scope.get("path", "")))
+        if scope["type"] != "http" or route is None:
+            await self.app(scope, receive, send)
+            return
+
+        pool_name, priority = route
+        pool = self.controller.pools[pool_name]
+        if pool.rate_limiter is not None:
+            wait = pool.rate_limiter.check(self.controller.client_key(scope))
+            if wait:
+                pool.limiter.shed["rate_limited"] += 1
+                response = _rejection(429, "Too many requests.", max(1, math.ceil(wait)))
+                await response(scope, receive, send)
+                return
+
+        try:
+            await pool.limiter.acquire(priority)
+        except Overloaded as exc:
+            response = _rejection(503, "Server is busy, please retry.", exc.retry_after)
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.limiter.release(time.monotonic() - started)
@@ -1,4 +1,14 @@
 """Agent module for Agentverse client."""
-from .agent import AgentverseClient, AgentMessage
+from __future__ import annotations
+
+from importlib import import_module
+from typing import Any
 
 __all__ = ["AgentverseClient", "AgentMessage"]
+
+
+def __getattr__(name: str) -> Any:
+    # uagents is expensive to import; defer it until the client is first used.
+    if name in __all__:
+        return getattr(import_module(".agent", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from pymongo.collection import Collection
+
+
+logger = logging.getLogger(__name__)
+
+# Entries expire with the client's max-age, so a worker that missed a refresh
+# serves stale listings for at most this long.
+CACHE_MAX_AGE = 60
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    etag: str
+    body: bytes
+    version: int
+    created: float = 0.0
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def encoded_etag(etag: str, content_encoding: Optional[str]) -> str:
+    """Give each content-coding its own strong validator."""
+    if not content_encoding:
+        return etag
+    return f'{etag[:-1]}-{content_encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {token.strip() for token in if_none_match.split(",")}
+    if "*" in candidates:
+        return True
+    return any(
+        candidate == etag or candidate.startswith(etag[:-1] + "-") for candidate in candidates
+    )
+
+
+class ZipResponseCache:
+    """
+    Per-ZIP cache of rendered listing responses.
+
+    Every ZIP carries a version counter that is bumped on invalidation, so a
+    render that raced with an invalidation is never stored as current.
+    Entries older than ``max_age`` seconds are re-rendered, since a refresh
+    or change event only reaches the worker that handles it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_age: float = CACHE_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, zip_code: str) -> int:
+        with self._lock:
+            return self._versions.get(zip_code, 0)
+
+    def get(self, zip_code: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(zip_code)
+            if entry is None:
+                return None
+            if self._clock() - entry.created >= self.max_age:
+                del self._entries[zip_code]
+                return None
+            self._entries.move_to_end(zip_code)
+            return entry
+
+    def get_or_render(self, zip_code: str, render: Callable[[], bytes]) -> CachedResponse:
+        entry = self.get(zip_code)
+        if entry is not None:
+            return entry
+
+        version = self.version(zip_code)
+        body = render()
+        entry = CachedResponse(etag=make_etag(body), body=body, version=version, created=self._clock())
+        with self._lock:
+            if self._versions.get(zip_code, 0) == version:
+                self._entries[zip_code] = entry
+                self._entries.move_to_end(zip_code)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, zip_code: str) -> None:
+        with self._lock:
+            self._versions[zip_code] = self._versions.get(zip_code, 0) + 1
+            self._entries.pop(zip_code, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for zip_code in set(self._versions) | set(self._entries):
+                self._versions[zip_code] = self._versions.get(zip_code, 0) + 1
+            self._entries.clear()
+
+
+def _apply_change(cache: ZipResponseCache, change: Dict[str, Any]) -> None:
+    document = change.get("fullDocument") or {}
+    updated = (change.get("updateDescription") or {}).get("updatedFields") or {}
+    zip_code = document.get("zipCode")
+
+    # Deletes and ZIP moves do not tell us the old ZIP, so drop everything.
+    if zip_code is None or "zipCode" in updated:
+        cache.clear()
+        return
+    cache.invalidate(zip_code)
+
+
+ChangeListener = Callable[[Dict[str, Any]], None]
+
+
+def watch_listing_changes(
+    collection: Collection[Dict[str, Any]],
+    cache: ZipResponseCache,
+    stop: threading.Event,
+    listeners: Sequence[ChangeListener] = (),
+) -> None:
+    """
+    Invalidate cached ZIPs from a Mongo change stream until ``stop`` is set,
+    forwarding every change event to ``listeners``.
+
+    Change streams need a replica set; on a standalone server the watcher
+    logs the failure and the explicit refresh endpoint remains the only
+    invalidation path.
+    """
+    try:
+        with collection.watch(full_document="updateLookup", max_await_time_ms=1000) as stream:
+            while not stop.is_set():
+                change = stream.try_next()
+                if change is not None:
+                    _apply_change(cache, change)
+                    for listener in listeners:
+                        listener(change)
+    except Exception:  # pragma: no cover - depends on the deployment
+        logger.exception("Listing change stream stopped; relying on explicit refresh.")
+
+
+def start_change_watcher(
+    collection: Collection[Dict[str, Any]],
+    cache: ZipResponseCache,
+    listeners: Sequence[ChangeListener] = (),
+) -> threading.Event:
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watch_listing_changes,
+        args=(collection, cache, stop, listeners),
+        name="listing-change-stream",
+        daemon=True,
+    )
+    thread.start()
+    return stop
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .listings import ListingIndex
+from .models import MapProperty, PropertyInput, RentEstimate, RentEstimateSubject
+
+
+DEFAULT_K = 8
+MIN_COMPS = 3
+MAX_K = 50
+
+# Listings are bucketed by lat/lng cell and, within a cell, by log price.
+# Queries visit cells nearest-first and stop once no unvisited cell can hold
+# a closer comp.
+_CELL_DEGREES = 0.03
+_PRICE_BUCKET = 0.2
+# Cells to expand before giving up on the local search, e.g. for a query far
+# outside the covered area, and walking every occupied cell instead.
+_SEARCH_BUDGET = 64
+_KM_PER_DEGREE_LAT = 110.57
+_KM_PER_DEGREE_LNG = 111.32
+
+# How much of each feature difference counts as one unit of distance.
+_KM_SCALE = 1.5
+_LOG_SIZE_SCALE = 0.2
+_BEDROOM_SCALE = 1.0
+_TYPE_MISMATCH = 1.0
+
+_Z_95 = 1.96
+
+
+class CompsQueryError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class CompsQuery:
+    lat: float
+    lng: float
+    listPrice: Optional[float] = None
+    sqft: Optional[int] = None
+    bedrooms: Optional[int] = None
+    propertyType: Optional[str] = None
+    excludeId: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class _Comp:
+    id: str
+    zip_code: str
+    lat: float
+    lng: float
+    log_price: Optional[float]
+    sqft: int
+    log_sqft: Optional[float]
+    bedrooms: int
+    property_type: str
+    rent: float
+
+
+def _log(value: Optional[float]) -> Optional[float]:
+    return math.log(value) if value and value > 0 else None
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / _CELL_DEGREES), math.floor(lng / _CELL_DEGREES)
+
+
+def _gap(value: float, low: float, high: float) -> float:
+    return low - value if value < low else value - high if value > high else 0.0
+
+
+def _price_bucket(log_price: Optional[float]) -> Optional[int]:
+    return math.floor(log_price / _PRICE_BUCKET) if log_price is not None else None
+
+
+class _Scorer:
+    """Distance from one query to candidate comps, with query terms precomputed."""
+
+    def __init__(self, query: CompsQuery) -> None:
+        self.query = query
+        self.km_per_lng = _KM_PER_DEGREE_LNG * math.cos(math.radians(query.lat))
+        self.log_price = _log(query.listPrice)
+        self.log_sqft = _log(query.sqft)
+        self.cell = _cell(query.lat, query.lng)
+
+    def cell_bound(self, cell: Tuple[int, int]) -> float:
+        """Squared distance units from the query to the nearest point of ``cell``."""
+        x, y = cell
+        dy = _gap(self.query.lat, x * _CELL_DEGREES, (x + 1) * _CELL_DEGREES) * _KM_PER_DEGREE_LAT
+        dx = _gap(self.query.lng, y * _CELL_DEGREES, (y + 1) * _CELL_DEGREES) * self.km_per_lng
+        return (dx * dx + dy * dy) / (_KM_SCALE * _KM_SCALE)
+
+    def price_bound(self, bucket: Optional[int]) -> float:
+        # Comps or queries without a price are never pruned on price.
+        if bucket is None or self.log_price is None:
+            return 0.0
+        gap = _gap(self.log_price, bucket * _PRICE_BUCKET, (bucket + 1) * _PRICE_BUCKET)
+        return (gap / _LOG_SIZE_SCALE) ** 2
+
+    def distance_squared(self, comp: _Comp) -> float:
+        query = self.query
+        dx = (comp.lng - query.lng) * self.km_per_lng
+        dy = (comp.lat - query.lat) * _KM_PER_DEGREE_LAT
+        total = (dx * dx + dy * dy) / (_KM_SCALE * _KM_SCALE)
+        if self.log_price is not None and comp.log_price is not None:
+            total += ((comp.log_price - self.log_price) / _LOG_SIZE_SCALE) ** 2
+        if self.log_sqft is not None and comp.log_sqft is not None:
+            total += ((comp.log_sqft - self.log_sqft) / _LOG_SIZE_SCALE) ** 2
+        if query.bedrooms is not None:
+            total += ((comp.bedrooms - query.bedrooms) / _BEDROOM_SCALE) ** 2
+        if query.propertyType is not None and comp.property_type != query.propertyType:
+            total += _TYPE_MISMATCH * _TYPE_MISMATCH
+        return total
+
+
+def _estimate(neighbors: Sequence[Tuple[float, _Comp]]) -> RentEstimate:
+    """Similarity-weighted mean rent with a 95% normal prediction interval."""
+    weights = [1.0 / (1.0 + distance) ** 2 for distance, _ in neighbors]
+    total = sum(weights)
+    mean = sum(weight * comp.rent for weight, (_, comp) in zip(weights, neighbors)) / total
+    variance = sum(weight * (comp.rent - mean) ** 2 for weight, (_, comp) in zip(weights, neighbors)) / total
+    effective_count = total * total / sum(weight * weight for weight in weights)
+    half_width = _Z_95 * math.sqrt(variance * (1 + 1 / effective_count))
+    return RentEstimate(
+        estimatedRent=round(mean, 2),
+        low=round(max(0.0, mean - half_width), 2),
+        high=round(mean + half_width, 2),
+        compIds=[comp.id for _, comp in neighbors],
+    )
+
+
+class CompsIndex(ListingIndex):
+    """
+    Nearest-comparable rent estimates over the listings.
+
+    Listings with a rent are kept in a grid over lat/lng and log price. A
+    query scores the listings in the cells around it on location, price, size,
+    bedrooms and property type, and returns the similarity-weighted rent of
+    the ``k`` closest with a prediction interval. Like the leaderboard, the
+    index is built from Mongo on first use and then maintained per listing.
+    """
+
+    def __init__(self, k: int = DEFAULT_K) -> None:
+        super().__init__()
+        self.k = k
+        self._comps: Dict[str, _Comp] = {}
+        # (lat cell, lng cell) -> price bucket -> comps
+        self._cells: Dict[Tuple[int, int], Dict[Optional[int], List[_Comp]]] = {}
+        self._zip_points: Dict[str, List[float]] = {}
+
+    def _discard(self, listing_id: str) -> None:
+        previous = self._comps.pop(listing_id, None)
+        if previous is None:
+            return
+        key = _cell(previous.lat, previous.lng)
+        buckets = self._cells[key]
+        bucket = _price_bucket(previous.log_price)
+        buckets[bucket].remove(previous)
+        if not buckets[bucket]:
+            del buckets[bucket]
+        if not buckets:
+            del self._cells[key]
+        point = self._zip_points[previous.zip_code]
+        point[0] -= previous.lat
+        point[1] -= previous.lng
+        point[2] -= 1
+        if not point[2]:
+            del self._zip_points[previous.zip_code]
+
+    def _add(self, listing: MapProperty) -> None:
+        if listing.estimatedRent <= 0:
+            return
+        comp = _Comp(
+            id=listing.id,
+            zip_code=listing.zipCode,
+            lat=listing.lat,
+            lng=listing.lng,
+            log_price=_log(listing.listPrice),
+            sqft=listing.sqft,
+            log_sqft=_log(listing.sqft),
+            bedrooms=listing.bedrooms,
+            property_type=listing.propertyType,
+            rent=listing.estimatedRent,
+        )
+        self._comps[listing.id] = comp
+        buckets = self._cells.setdefault(_cell(comp.lat, comp.lng), {})
+        buckets.setdefault(_price_bucket(comp.log_price), []).append(comp)
+        point = self._zip_points.setdefault(comp.zip_code, [0.0, 0.0, 0])
+        point[0] += comp.lat
+        point[1] += comp.lng
+        point[2] += 1
+
+    def _clear(self) -> None:
+        self._comps.clear()
+        self._cells.clear()
+        self._zip_points.clear()
+
+    def _nearest(self, query: CompsQuery, k: int) -> List[Tuple[float, _Comp]]:
+        scorer = _Scorer(query)
+        # Max-heap of the best k as (-squared distance, id, comp).
+        best: List[Tuple[float, str, _Comp]] = []
+        limit = math.inf
+        price_bounds: Dict[Optional[int], float] = {}
+
+        def visit(cell: Tuple[int, int], cell_bound: float) -> None:
+            nonlocal limit
+            for bucket, comps in self._cells.get(cell, {}).items():
+                price_bound = price_bounds.get(bucket)
+                if price_bound is None:
+                    price_bound = price_bounds[bucket] = scorer.price_bound(bucket)
+                # limit only shrinks, so a bucket skipped now never qualifies later.
+                if cell_bound + price_bound > limit:
+                    continue
+                for comp in comps:
+                    if comp.id == query.excludeId:
+                        continue
+                    distance = scorer.distance_squared(comp)
+                    if distance >= limit:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, comp.id, comp))
+                    else:
+                        heapq.heapreplace(best, (-distance, comp.id, comp))
+                    if len(best) == k:
+                        limit = -best[0][0]
+
+        start = scorer.cell
+        frontier = [(0.0, start)]
+        seen = {start}
+        visited: Set[Tuple[int, int]] = set()
+        while frontier:
+            cell_bound, cell = heapq.heappop(frontier)
+            if cell_bound > limit:
+                return self._ranked(best)
+            visit(cell, cell_bound)
+            visited.add(cell)
+            if len(visited) == _SEARCH_BUDGET:
+                break
+            x, y = cell
+            for neighbor in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    heapq.heappush(frontier, (scorer.cell_bound(neighbor), neighbor))
+
+        # Sparse area: walk the remaining occupied cells nearest first.
+        remaining = sorted(
+            (scorer.cell_bound(cell), cell) for cell in self._cells if cell not in visited
+        )
+        for cell_bound, cell in remaining:
+            if cell_bound > limit:
+                break
+            visit(cell, cell_bound)
+        return self._ranked(best)
+
+    @staticmethod
+    def _ranked(best: List[Tuple[float, str, _Comp]]) -> List[Tuple[float, _Comp]]:
+        return [(math.sqrt(-distance), comp) for distance, _, comp in sorted(best, reverse=True)]
+
+    def estimate(self, query: CompsQuery, k: Optional[int] = None) -> Optional[RentEstimate]:
+        return self.estimate_many([query], k)[0]
+
+    def estimate_many(
+        self, queries: Sequence[Optional[CompsQuery]], k: Optional[int] = None
+    ) -> List[Optional[RentEstimate]]:
+        """Estimate a batch under one lock; ``None`` where there are too few comps."""
+        k = k or self.k
+        if not MIN_COMPS <= k <= MAX_K:
+            raise CompsQueryError(f"k must be between {MIN_COMPS} and {MAX_K}.")
+        estimates: List[Optional[RentEstimate]] = []
+        with self._lock:
+            for query in queries:
+                neighbors = self._nearest(query, k) if query is not None else []
+                estimates.append(_estimate(neighbors) if len(neighbors) >= MIN_COMPS else None)
+        return estimates
+
+    def zip_centroid(self, zip_code: str) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            point = self._zip_points.get(zip_code)
+            if point is None:
+                return None
+            return point[0] / point[2], point[1] / point[2]
+
+    def query_for_property(self, prop: PropertyInput, zip_code: str) -> Optional[CompsQuery]:
+        """
+        Deals carry no coordinates or size. When the deal came from a stored
+        listing (same id), use that listing's location, size, bedrooms and
+        type and leave it out of its own comps; otherwise use the ZIP's
+        centroid and the asking price.
+        """
+        with self._lock:
+            listing = self._comps.get(prop.id)
+            if listing is not None:
+                return CompsQuery(
+                    lat=listing.lat,
+                    lng=listing.lng,
+                    listPrice=prop.listPrice,
+                    sqft=listing.sqft or None,
+                    bedrooms=listing.bedrooms,
+                    propertyType=listing.property_type,
+                    excludeId=listing.id,
+                )
+        centroid = self.zip_centroid(prop.zipCode or zip_code) or self.zip_centroid(zip_code)
+        if centroid is None:
+            return None
+        return CompsQuery(lat=centroid[0], lng=centroid[1], listPrice=prop.listPrice)
+
+    def query_for_subject(self, subject: RentEstimateSubject) -> Optional[CompsQuery]:
+        if subject.lat is not None and subject.lng is not None:
+            location: Optional[Tuple[float, float]] = (subject.lat, subject.lng)
+        else:
+            location = self.zip_centroid(subject.zipCode) if subject.zipCode else None
+        if location is None:
+            return None
+        return CompsQuery(
+            lat=location[0],
+            lng=location[1],
+            listPrice=subject.listPrice,
+            sqft=subject.sqft,
+            bedrooms=subject.bedrooms,
+            propertyType=subject.propertyType,
+        )
+
+    def estimate_property_rent(self, prop: PropertyInput, zip_code: str) -> Optional[RentEstimate]:
+        """``logic`` rent provider. Never touches Mongo; ``None`` until loaded."""
+        if not self._loaded:
+            return None
+        query = self.query_for_property(prop, zip_code)
+        return self.estimate(query) if query is not None else None
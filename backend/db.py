@@ -6,7 +6,7 @@ from dotenv import dotenv_values, load_dotenv
 from functools import lru_cache
 from typing import Any, Dict
 
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient
 from pymongo.collection import Collection
 
 
@@ -28,4 +28,11 @@ def get_properties_collection() -> Collection[Dict[str, Any]]:
     db_name = os.getenv("MONGODB_DB", "EstateAI")
     collection_name = os.getenv("MONGODB_COLLECTION", "Sample-Listing")
 
-    return _client()[db_name][collection_name]
\ No newline at end of file
+    return _client()[db_name][collection_name]
+
+
+def ensure_listing_indexes(collection: Collection[Dict[str, Any]]) -> None:
+    """Create the indexes behind ZIP lookups and keyset pagination."""
+    collection.create_index([("id", ASCENDING)], unique=True, sparse=True)
+    collection.create_index([("zipCode", ASCENDING), ("_id", ASCENDING)])
+    collection.create_index([("zipCode", ASCENDING), ("listPrice", ASCENDING), ("_id", ASCENDING)])
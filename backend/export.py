@@ -0,0 +1,225 @@
+"""
+Columnar export of scored deals as Apache Arrow IPC streams or Parquet.
+
+Results are scored lazily and written in record batches, so memory stays
+flat however many listings are exported. ``pyarrow`` is imported on first
+use only.
+
+Usage:
+    python -m backend.export listings.parquet
+    python -m backend.export boston.arrow --zip 02118 --format arrow
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, get_args, get_origin
+
+from pydantic import BaseModel
+from pymongo.collection import Collection
+
+from .db import get_properties_collection
+from .listings import iter_valid_listings
+from .logic import analyze_listing, analyze_property
+from .models import (
+    DealMetrics,
+    GlobalAssumptions,
+    PropertyAnalysisResult,
+    PropertyInput,
+    RentEstimate,
+    YearProjection,
+)
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("arrow", "parquet")
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+DEFAULT_BATCH_SIZE = 2048
+
+
+class ExportUnavailableError(RuntimeError):
+    pass
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ExportUnavailableError("pyarrow is not installed.") from exc
+    return pyarrow
+
+
+def _arrow_type(pa, annotation: Any):
+    if annotation is float:
+        return pa.float64()
+    if annotation is int:
+        return pa.int64()
+    if annotation is str or get_origin(annotation) is Literal:
+        return pa.string()
+    if get_origin(annotation) is list:
+        return pa.list_(_arrow_type(pa, get_args(annotation)[0]))
+    raise TypeError(f"No Arrow type for {annotation!r}")
+
+
+def _fields(pa, model: type[BaseModel]) -> List[Any]:
+    return [
+        pa.field(name, _arrow_type(pa, info.annotation), nullable=False)
+        for name, info in model.model_fields.items()
+    ]
+
+
+def export_schema():
+    """
+    One row per deal: the property inputs, its DealMetrics, the score, a
+    nested 5-year timeline and, when a blank rent was filled from comps, the
+    ``rentEstimate`` it came from (null for entered rents).
+    """
+    pa = _pyarrow()
+    return pa.schema(
+        _fields(pa, PropertyInput)
+        + _fields(pa, DealMetrics)
+        + [
+            pa.field("overallScore", pa.float64(), nullable=False),
+            pa.field("timeline", pa.list_(pa.struct(_fields(pa, YearProjection))), nullable=False),
+            pa.field("rentEstimate", pa.struct(_fields(pa, RentEstimate)), nullable=True),
+        ]
+    )
+
+
+def _row(result: PropertyAnalysisResult) -> Dict[str, Any]:
+    row = result.property.model_dump()
+    row.update(result.metrics.model_dump())
+    row["overallScore"] = result.overallScore
+    row["timeline"] = [year.model_dump() for year in result.timeline]
+    row["rentEstimate"] = result.rentEstimate.model_dump() if result.rentEstimate else None
+    return row
+
+
+def iter_record_batches(
+    results: Iterable[PropertyAnalysisResult], batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[Any]:
+    pa = _pyarrow()
+    schema = export_schema()
+    rows: List[Dict[str, Any]] = []
+    for result in results:
+        rows.append(_row(result))
+        if len(rows) >= batch_size:
+            yield pa.RecordBatch.from_pylist(rows, schema=schema)
+            rows = []
+    if rows:
+        yield pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after each batch."""
+
+    def __init__(self) -> None:
+        self.closed = False
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_export(
+    results: Iterable[PropertyAnalysisResult],
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Yield the encoded export chunk by chunk, one record batch at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}.")
+    pa = _pyarrow()
+    schema = export_schema()
+    sink = _ChunkSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+
+    try:
+        for batch in iter_record_batches(results, batch_size):
+            if fmt == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def score_properties(
+    properties: Iterable[PropertyInput], assumptions: GlobalAssumptions, zip_code: str
+) -> Iterator[PropertyAnalysisResult]:
+    for prop in properties:
+        yield analyze_property(prop, assumptions, zip_code)
+
+
+def score_listings(
+    collection: Collection[Dict[str, Any]],
+    *,
+    zip_code: Optional[str] = None,
+    assumptions: Optional[GlobalAssumptions] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[PropertyAnalysisResult]:
+    """Score stored listings straight off the Mongo cursor."""
+    assumptions = assumptions or GlobalAssumptions()
+    criteria = {"zipCode": zip_code} if zip_code else {}
+    for listing in iter_valid_listings(collection, criteria, batch_size=batch_size):
+        yield analyze_listing(listing, assumptions)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export scored listings as Arrow or Parquet.")
+    parser.add_argument("path", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the output file extension")
+    parser.add_argument("--zip", dest="zip_code", help="Only export one ZIP code")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("arrow" if args.path.endswith((".arrow", ".arrows")) else "parquet")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    started = time.perf_counter()
+    results = score_listings(
+        get_properties_collection(), zip_code=args.zip_code, batch_size=args.batch_size
+    )
+
+    written = 0
+    output = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+    try:
+        for chunk in stream_export(results, fmt, args.batch_size):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    logger.info("Wrote %d bytes of %s in %.2fs", written, fmt, time.perf_counter() - started)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+"""
+Measure what ``import backend.main`` costs on a cold interpreter.
+
+Usage:
+    python -m backend.importtime
+    python -m backend.importtime --top 20 --budget-ms 1500
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Heavy optional stacks that must only load when their endpoints are used.
+LAZY_MODULES = ("uagents", "httpx", "pyarrow")
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def measure(target: str = "backend.main") -> List[ImportTiming]:
+    env = dict(os.environ)
+    env.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=_REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        timings.append(ImportTiming(module.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def loaded_lazy_modules(timings: Sequence[ImportTiming]) -> List[str]:
+    return sorted({t.module for t in timings if t.module.split(".")[0] in LAZY_MODULES})
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report import time of the API module.")
+    parser.add_argument("--target", default="backend.main")
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level packages to list")
+    parser.add_argument("--budget-ms", type=float, help="Fail when the target import exceeds this")
+    args = parser.parse_args(argv)
+
+    timings = measure(args.target)
+    by_package: Dict[str, int] = {}
+    for timing in timings:
+        package = timing.module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + timing.self_us
+    total_us = next(t.cumulative_us for t in timings if t.module == args.target)
+
+    print(f"{args.target}: {total_us / 1000:.1f} ms")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    status = 0
+    lazy = loaded_lazy_modules(timings)
+    if lazy:
+        print(f"Eagerly imported lazy modules: {', '.join(lazy)}")
+        status = 1
+    if args.budget_ms is not None and total_us / 1000 > args.budget_ms:
+        print(f"Import time exceeds budget of {args.budget_ms:.0f} ms")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,293 @@
+"""
+Bulk-load listings from JSON or CSV files into Mongo.
+
+Usage:
+    python -m backend.ingest data/sample-listings.json
+    python -m backend.ingest listings.csv --batch-size 2000
+    python -m backend.ingest listings.csv --refresh-url http://localhost:8000 --snapshot data/listings.snap
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, TextIO
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+
+from .db import ensure_listing_indexes, get_properties_collection
+from .models import MapProperty
+from .snapshot import SnapshotRebuilder
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# Past this many touched ZIPs a single full refresh beats one call per ZIP.
+REFRESH_ALL_THRESHOLD = 50
+_READ_CHUNK = 1 << 16
+
+BatchListener = Callable[[List[Dict[str, Any]]], None]
+
+
+@dataclass
+class IngestStats:
+    rows: int = 0
+    invalid: int = 0
+    upserted: int = 0
+    modified: int = 0
+    batches: int = 0
+    elapsed_s: float = 0.0
+    zip_codes: Set[str] = field(default_factory=set)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def iter_json_array(handle: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the elements of a top-level JSON array without reading it whole.
+
+    Missing or trailing commas, a truncated array and anything but whitespace
+    after the closing bracket raise ``ValueError``.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+    # What may come next: "[", a "value" (or "]" if nothing has been read
+    # yet), a "separator" ("," or "]"), or only whitespace once "closed".
+    expect = "["
+    empty = True
+
+    while True:
+        buffer = buffer.lstrip()
+        if buffer:
+            if expect == "closed":
+                raise ValueError("Unexpected data after the JSON array.")
+            if expect == "[":
+                if buffer[0] != "[":
+                    raise ValueError("Expected a JSON array of listings.")
+                buffer = buffer[1:]
+                expect = "value"
+                continue
+            if expect == "separator":
+                if buffer[0] not in ",]":
+                    raise ValueError("Expected ',' or ']' between listings.")
+                expect = "value" if buffer[0] == "," else "closed"
+                buffer = buffer[1:]
+                continue
+            if buffer[0] == "]":
+                if not empty:
+                    raise ValueError("Trailing comma in JSON array.")
+                buffer = buffer[1:]
+                expect = "closed"
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A number may continue in the next chunk.
+                if end < len(buffer) or eof:
+                    buffer = buffer[end:]
+                    expect = "separator"
+                    empty = False
+                    yield item
+                    continue
+        if eof:
+            if expect != "closed":
+                raise ValueError("Unexpected end of JSON array.")
+            return
+        chunk = handle.read(_READ_CHUNK)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_csv_rows(handle: TextIO) -> Iterator[Dict[str, Any]]:
+    # Empty cells fall back to the model defaults instead of failing validation.
+    for row in csv.DictReader(handle):
+        yield {key: value for key, value in row.items() if value not in ("", None)}
+
+
+def iter_listing_file(path: Path, handle: TextIO, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    fmt = fmt or path.suffix.lstrip(".").lower()
+    if fmt == "json":
+        return iter_json_array(handle)
+    if fmt == "csv":
+        return iter_csv_rows(handle)
+    raise ValueError(f"Unsupported listing format: {fmt!r}")
+
+
+def _flush(
+    collection: Collection[Dict[str, Any]],
+    batch: List[Dict[str, Any]],
+    stats: IngestStats,
+    listeners: Sequence[BatchListener],
+) -> None:
+    operations = [UpdateOne({"id": doc["id"]}, {"$set": doc}, upsert=True) for doc in batch]
+    result = collection.bulk_write(operations, ordered=False)
+    stats.upserted += result.upserted_count
+    stats.modified += result.modified_count
+    stats.batches += 1
+    for listener in listeners:
+        listener(batch)
+
+
+def ingest_listings(
+    collection: Collection[Dict[str, Any]],
+    rows: Iterable[Dict[str, Any]],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    listeners: Sequence[BatchListener] = (),
+) -> IngestStats:
+    """
+    Validate rows against ``MapProperty`` and upsert them by listing ``id``.
+
+    Reruns are idempotent: unchanged listings count as neither upserted nor
+    modified. ``listeners`` receive every written batch so derived data can
+    be refreshed incrementally instead of rebuilt from scratch.
+    """
+    stats = IngestStats()
+    started = time.perf_counter()
+    batch: List[Dict[str, Any]] = []
+
+    for row in rows:
+        stats.rows += 1
+        try:
+            listing = MapProperty.model_validate(row)
+        except ValidationError as exc:
+            stats.invalid += 1
+            logger.warning("Skipping invalid listing row %d: %s", stats.rows, exc.errors()[0]["msg"])
+            continue
+        batch.append(listing.model_dump())
+        stats.zip_codes.add(listing.zipCode)
+        if len(batch) >= batch_size:
+            _flush(collection, batch, stats, listeners)
+            batch = []
+            logger.info("Ingested %d rows (%.0f rows/s)", stats.rows, stats.rows / (time.perf_counter() - started))
+
+    if batch:
+        _flush(collection, batch, stats, listeners)
+
+    stats.elapsed_s = time.perf_counter() - started
+    return stats
+
+
+def ingest_file(
+    collection: Collection[Dict[str, Any]],
+    path: Path,
+    *,
+    fmt: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    listeners: Sequence[BatchListener] = (),
+    build_indexes: bool = True,
+) -> IngestStats:
+    """
+    Load one listings file. Indexes are built first so every upsert finds its
+    listing through the unique ``id`` index instead of scanning the
+    collection; that raises ``DuplicateKeyError`` before anything is written
+    if the collection already holds duplicate ids.
+    """
+    if build_indexes:
+        ensure_listing_indexes(collection)
+    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+        return ingest_listings(
+            collection,
+            iter_listing_file(path, handle, fmt),
+            batch_size=batch_size,
+            listeners=listeners,
+        )
+
+
+def refresh_api(base_url: str, zip_codes: Iterable[str], *, timeout: float = 10.0) -> bool:
+    """
+    Ask a running API to reload its caches and indexes for ``zip_codes``.
+
+    Each API worker keeps its own in-memory state, so behind several workers
+    only the one that answers is refreshed; run those with
+    ``MONGODB_WATCH_CHANGES=1`` instead. Returns ``False`` if any call failed.
+    """
+    base_url = base_url.rstrip("/")
+    zip_codes = sorted(zip_codes)
+    if len(zip_codes) > REFRESH_ALL_THRESHOLD:
+        urls = [f"{base_url}/api/properties/refresh"]
+    else:
+        urls = [
+            f"{base_url}/api/properties/{urllib.parse.quote(zip_code, safe='')}/refresh"
+            for zip_code in zip_codes
+        ]
+
+    ok = True
+    for url in urls:
+        request = urllib.request.Request(url, data=b"", method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+        except OSError as exc:
+            logger.error("Refreshing %s failed: %s", url, exc)
+            ok = False
+    return ok
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-load listings into MongoDB.")
+    parser.add_argument("path", type=Path, help="JSON array or CSV file of listings")
+    parser.add_argument("--format", choices=("json", "csv"), help="Override format detection")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--skip-indexes", action="store_true", help="Do not rebuild indexes")
+    parser.add_argument(
+        "--refresh-url",
+        help="Base URL of a running API to refresh for the touched ZIPs, e.g. http://localhost:8000",
+    )
+    parser.add_argument("--snapshot", type=Path, help="Rebuild this listings snapshot afterwards")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    collection = get_properties_collection()
+    try:
+        stats = ingest_file(
+            collection,
+            args.path,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            build_indexes=not args.skip_indexes,
+        )
+    except DuplicateKeyError as exc:
+        logger.error("Cannot build the unique listing id index; remove the duplicate ids first: %s", exc)
+        return 1
+    except ValueError as exc:
+        logger.error("Stopped reading %s: %s", args.path, exc)
+        return 1
+    logger.info(
+        "Done: %d rows, %d upserted, %d modified, %d invalid across %d ZIPs in %.2fs (%.0f rows/s)",
+        stats.rows,
+        stats.upserted,
+        stats.modified,
+        stats.invalid,
+        len(stats.zip_codes),
+        stats.elapsed_s,
+        stats.rows_per_second,
+    )
+
+    failed = bool(stats.invalid)
+    if args.snapshot is not None:
+        version = SnapshotRebuilder(collection, args.snapshot).rebuild()
+        logger.info("Rebuilt snapshot v%d at %s", version, args.snapshot)
+    if args.refresh_url and stats.zip_codes:
+        failed = not refresh_api(args.refresh_url, stats.zip_codes) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
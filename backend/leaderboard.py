@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from dataclasses import asdict, dataclass
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, get_args
+
+from .listings import ListingIndex
+from .logic import analyze_listing
+from .models import GlobalAssumptions, MapProperty
+
+
+METRICS = ("overallScore", "cashOnCashReturnPercent", "capRatePercent")
+GLOBAL_REGION = "*"
+MAX_LIMIT = 500
+PROPERTY_TYPES = get_args(MapProperty.model_fields["propertyType"].annotation)
+
+# Width of a price band in log10 dollars, so each band spans about 26%.
+_PRICE_BAND = 0.1
+
+# (region, propertyType or None for all types, metric)
+_BoardKey = Tuple[str, Optional[str], str]
+
+
+class LeaderboardQueryError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    id: str
+    address: str
+    zipCode: str
+    propertyType: str
+    listPrice: float
+    lat: float
+    lng: float
+    overallScore: float
+    cashOnCashReturnPercent: float
+    capRatePercent: float
+    monthlyCashFlow: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_region(region: Optional[str]) -> str:
+    """Accept ``021xx``/``021`` for a ZIP prefix, a full ZIP, or nothing for all."""
+    if not region:
+        return GLOBAL_REGION
+    digits = region.lower().rstrip("x")
+    if digits.isdigit() and len(digits) in (3, 5):
+        return digits
+    raise LeaderboardQueryError("region must be a ZIP code or 3-digit prefix such as 021xx.")
+
+
+def _regions(zip_code: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys((GLOBAL_REGION, zip_code[:3], zip_code)))
+
+
+def _price_band(price: float) -> int:
+    return math.floor(math.log10(price) / _PRICE_BAND) if price > 1 else 0
+
+
+class Leaderboard(ListingIndex):
+    """
+    Top listings by score metric per region (all, 3-digit ZIP prefix, ZIP)
+    and property type.
+
+    Every board is split into price bands, each a list kept sorted
+    best-first, so a listing update is a binary search plus a list
+    insert/delete per board, and a top-K query merges the heads of the bands.
+    A price cap merges only the bands below it and filters the one band it
+    falls in, so expensive high scorers are never walked past.
+    """
+
+    def __init__(self, assumptions: Optional[GlobalAssumptions] = None) -> None:
+        super().__init__()
+        self.assumptions = assumptions or GlobalAssumptions()
+        self._entries: Dict[str, LeaderboardEntry] = {}
+        # board -> price band -> (-metric, listing id), best first
+        self._boards: Dict[_BoardKey, Dict[int, List[Tuple[float, str]]]] = {}
+
+    @staticmethod
+    def _keys(entry: LeaderboardEntry) -> Iterator[Tuple[_BoardKey, float]]:
+        for region in _regions(entry.zipCode):
+            for property_type in (None, entry.propertyType):
+                for metric in METRICS:
+                    yield (region, property_type, metric), getattr(entry, metric)
+
+    def _discard(self, listing_id: str) -> None:
+        previous = self._entries.pop(listing_id, None)
+        if previous is None:
+            return
+        band = _price_band(previous.listPrice)
+        for key, value in self._keys(previous):
+            bands = self._boards[key]
+            board = bands[band]
+            del board[bisect_left(board, (-value, listing_id))]
+            if not board:
+                del bands[band]
+                if not bands:
+                    del self._boards[key]
+
+    def _add(self, listing: MapProperty) -> None:
+        result = analyze_listing(listing, self.assumptions)
+        entry = LeaderboardEntry(
+            id=listing.id,
+            address=listing.address,
+            zipCode=listing.zipCode,
+            propertyType=listing.propertyType,
+            listPrice=listing.listPrice,
+            lat=listing.lat,
+            lng=listing.lng,
+            overallScore=result.overallScore,
+            cashOnCashReturnPercent=result.metrics.cashOnCashReturnPercent,
+            capRatePercent=result.metrics.capRatePercent,
+            monthlyCashFlow=result.metrics.monthlyCashFlow,
+        )
+        self._entries[listing.id] = entry
+        band = _price_band(entry.listPrice)
+        for key, value in self._keys(entry):
+            insort(self._boards.setdefault(key, {}).setdefault(band, []), (-value, listing.id))
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._boards.clear()
+
+    def top(
+        self,
+        *,
+        metric: str = "overallScore",
+        region: str = GLOBAL_REGION,
+        property_type: Optional[str] = None,
+        max_price: Optional[float] = None,
+        limit: int = 50,
+    ) -> List[LeaderboardEntry]:
+        if metric not in METRICS:
+            raise LeaderboardQueryError(f"metric must be one of: {', '.join(METRICS)}.")
+        if not 1 <= limit <= MAX_LIMIT:
+            raise LeaderboardQueryError(f"limit must be between 1 and {MAX_LIMIT}.")
+        if property_type is not None and property_type not in PROPERTY_TYPES:
+            raise LeaderboardQueryError(f"propertyType must be one of: {', '.join(PROPERTY_TYPES)}.")
+
+        with self._lock:
+            bands = self._boards.get((region, property_type, metric), {})
+            heads: List[Iterable[Tuple[float, str]]]
+            if max_price is None:
+                heads = [islice(board, limit) for board in bands.values()]
+            else:
+                cap = _price_band(max_price)
+                heads = [islice(board, limit) for band, board in bands.items() if band < cap]
+                if cap in bands:
+                    heads.append(
+                        item for item in bands[cap] if self._entries[item[1]].listPrice <= max_price
+                    )
+            return [self._entries[listing_id] for _, listing_id in islice(heapq.merge(*heads), limit)]
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import base64
+import json
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pydantic import ValidationError
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.cursor import Cursor
+
+from .models import MapProperty
+
+
+SORT_KEYS = ("_id", "listPrice")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 200
+
+LISTING_PROJECTION = {name: 1 for name in MapProperty.model_fields}
+
+_PROJECTABLE_FIELDS = frozenset(MapProperty.model_fields) | {"_id"}
+
+
+class ListingQueryError(ValueError):
+    pass
+
+
+@dataclass
+class ListingQuery:
+    zip_code: str
+    sort: str = "_id"
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    fields: Optional[List[str]] = None
+
+
+def parse_fields(raw: Optional[str]) -> Optional[List[str]]:
+    if not raw:
+        return None
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(fields) - _PROJECTABLE_FIELDS)
+    if unknown:
+        raise ListingQueryError(f"Unknown fields: {', '.join(unknown)}.")
+    return fields
+
+
+def encode_cursor(sort: str, document: Dict[str, Any]) -> str:
+    state = {"s": sort, "id": str(document["_id"])}
+    if sort != "_id":
+        state["v"] = document.get(sort)
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = ObjectId(state["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise ListingQueryError("Invalid cursor.") from None
+    if state.get("s") != sort:
+        raise ListingQueryError("Cursor was issued for a different sort order.")
+    if sort == "_id":
+        return {"_id": {"$gt": last_id}}
+    value = state.get("v")
+    return {
+        "$or": [
+            {sort: {"$gt": value}},
+            {sort: value, "_id": {"$gt": last_id}},
+        ]
+    }
+
+
+def _validate(query: ListingQuery) -> None:
+    if query.sort not in SORT_KEYS:
+        raise ListingQueryError(f"sort must be one of: {', '.join(SORT_KEYS)}.")
+    if query.limit is not None and not 1 <= query.limit <= MAX_PAGE_SIZE:
+        raise ListingQueryError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+
+def _find(collection: Collection[Dict[str, Any]], query: ListingQuery, limit: int) -> Cursor:
+    _validate(query)
+    criteria: Dict[str, Any] = {"zipCode": query.zip_code}
+    if query.cursor:
+        criteria.update(decode_cursor(query.sort, query.cursor))
+
+    projection = None
+    if query.fields is not None:
+        # The sort key and _id are always fetched so the next cursor can be built.
+        projection = {name: 1 for name in query.fields}
+        projection[query.sort] = 1
+
+    sort_spec = [(query.sort, ASCENDING)]
+    if query.sort != "_id":
+        sort_spec.append(("_id", ASCENDING))
+    return collection.find(criteria, projection).sort(sort_spec).limit(limit)
+
+
+def _shape(document: Dict[str, Any], query: ListingQuery) -> Dict[str, Any]:
+    if query.fields is not None and query.sort not in query.fields:
+        document.pop(query.sort, None)
+    if query.fields is not None and "_id" not in query.fields:
+        document.pop("_id", None)
+    return document
+
+
+def fetch_page(
+    collection: Collection[Dict[str, Any]], query: ListingQuery
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Return one keyset page of listings for a ZIP plus the cursor of the next
+    page, or ``None`` when the ZIP is exhausted.
+    """
+    limit = query.limit or DEFAULT_PAGE_SIZE
+    documents = list(_find(collection, query, limit + 1))
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+
+    next_cursor = encode_cursor(query.sort, documents[-1]) if has_more else None
+    return [_shape(document, query) for document in documents], next_cursor
+
+
+def iter_listings(
+    collection: Collection[Dict[str, Any]], query: ListingQuery
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield listings lazily from the Mongo cursor, starting after
+    ``query.cursor``. Without a limit the whole ZIP is streamed.
+
+    The query is validated eagerly so errors surface before streaming starts.
+    """
+    cursor = _find(collection, query, query.limit or 0).batch_size(STREAM_BATCH_SIZE)
+    return (_shape(document, query) for document in cursor)
+
+
+def _iter_valid_documents(
+    collection: Collection[Dict[str, Any]],
+    criteria: Optional[Dict[str, Any]] = None,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[Tuple[Any, MapProperty]]:
+    cursor = collection.find(criteria or {}, LISTING_PROJECTION).batch_size(batch_size)
+    for document in cursor:
+        try:
+            yield document.get("_id"), MapProperty.model_validate(document)
+        except ValidationError:
+            continue
+
+
+def iter_valid_listings(
+    collection: Collection[Dict[str, Any]],
+    criteria: Optional[Dict[str, Any]] = None,
+    *,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[MapProperty]:
+    """Yield stored listings as ``MapProperty``, skipping documents that fail validation."""
+    return (listing for _, listing in _iter_valid_documents(collection, criteria, batch_size))
+
+
+class ListingIndex(ABC):
+    """
+    Base for in-memory indexes derived from the listings collection.
+
+    Subclasses store one listing with ``_add``, drop one with ``_discard``
+    and empty themselves with ``_clear``; this class keeps them in step with
+    Mongo. ``ensure_loaded`` reads the collection once, with concurrent
+    callers waiting for a single load. ``on_batch`` plugs into
+    ``ingest_listings`` and ``apply_change`` into the listing change stream,
+    including deletes, which only carry the Mongo ``_id``. ``refresh``
+    re-reads everything or one ZIP while the current contents keep serving
+    reads, so a loaded index never goes cold.
+    """
+
+    def __init__(self) -> None:
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        # listing id -> (ZIP, Mongo _id)
+        self._tracked: Dict[str, Tuple[str, Any]] = {}
+        self._by_zip: Dict[str, Set[str]] = {}
+        self._by_document: Dict[Any, str] = {}
+        # Changes seen while a load is reading Mongo, replayed on top of it.
+        self._pending: Optional[List[Callable[[], None]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @abstractmethod
+    def _add(self, listing: MapProperty) -> None:
+        ...
+
+    @abstractmethod
+    def _discard(self, listing_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def _clear(self) -> None:
+        ...
+
+    def _forget(self, listing_id: str) -> None:
+        tracked = self._tracked.pop(listing_id, None)
+        if tracked is None:
+            return
+        zip_code, document_id = tracked
+        listing_ids = self._by_zip[zip_code]
+        listing_ids.discard(listing_id)
+        if not listing_ids:
+            del self._by_zip[zip_code]
+        if self._by_document.get(document_id) == listing_id:
+            del self._by_document[document_id]
+        self._discard(listing_id)
+
+    def _forget_document(self, document_id: Any) -> None:
+        listing_id = self._by_document.get(document_id)
+        if listing_id is not None:
+            self._forget(listing_id)
+
+    def _track(self, listing: MapProperty, document_id: Any = None) -> None:
+        previous = self._tracked.get(listing.id)
+        if document_id is None and previous is not None:
+            document_id = previous[1]
+        self._forget(listing.id)
+        self._tracked[listing.id] = (listing.zipCode, document_id)
+        self._by_zip.setdefault(listing.zipCode, set()).add(listing.id)
+        if document_id is not None:
+            self._by_document[document_id] = listing.id
+        self._add(listing)
+
+    def _record(self, change: Callable[[], None]) -> None:
+        if self._pending is not None:
+            self._pending.append(change)
+        if self._loaded:
+            change()
+
+    def upsert(self, listing: MapProperty, document_id: Any = None) -> None:
+        with self._lock:
+            self._record(lambda: self._track(listing, document_id))
+
+    def remove(self, listing_id: str) -> None:
+        with self._lock:
+            self._record(lambda: self._forget(listing_id))
+
+    def remove_document(self, document_id: Any) -> None:
+        with self._lock:
+            self._record(lambda: self._forget_document(document_id))
+
+    def on_batch(self, batch: List[Dict[str, Any]]) -> None:
+        for document in batch:
+            self.upsert(MapProperty.model_validate(document), document.get("_id"))
+
+    def apply_change(self, change: Dict[str, Any]) -> None:
+        document = change.get("fullDocument")
+        document_id = (change.get("documentKey") or {}).get("_id")
+        if document is None:
+            # Deletes, and updates of since-deleted listings, carry only the _id.
+            self.remove_document(document_id)
+            return
+        try:
+            listing = MapProperty.model_validate(document)
+        except ValidationError:
+            # A reload would skip the invalid document too.
+            self.remove_document(document.get("_id", document_id))
+            return
+        self.upsert(listing, document.get("_id", document_id))
+
+    def load(self, listings: Iterable[MapProperty]) -> None:
+        with self._lock:
+            self._replace(((None, listing) for listing in listings), None)
+
+    def _replace(self, documents: Iterable[Tuple[Any, MapProperty]], zip_code: Optional[str]) -> None:
+        if zip_code is None:
+            self._clear()
+            self._tracked.clear()
+            self._by_zip.clear()
+            self._by_document.clear()
+        else:
+            for listing_id in list(self._by_zip.get(zip_code, ())):
+                self._forget(listing_id)
+        for document_id, listing in documents:
+            self._track(listing, document_id)
+        self._loaded = True
+
+    def _read(self, collection: Collection[Dict[str, Any]], zip_code: Optional[str] = None) -> None:
+        with self._lock:
+            self._pending = []
+        try:
+            # Query outside the lock so the current contents stay readable meanwhile.
+            criteria = {"zipCode": zip_code} if zip_code is not None else None
+            documents = list(_iter_valid_documents(collection, criteria))
+            with self._lock:
+                self._replace(documents, zip_code)
+                for change in self._pending:
+                    change()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def ensure_loaded(self, collection: Collection[Dict[str, Any]]) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._read(collection)
+
+    def refresh(self, collection: Collection[Dict[str, Any]], zip_code: Optional[str] = None) -> None:
+        """Re-read a loaded index, or only ``zip_code``'s listings, from Mongo."""
+        with self._load_lock:
+            if self._loaded:
+                self._read(collection, zip_code)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from pydantic import ValidationError
+from starlette.websockets import WebSocket, WebSocketDisconnect, WebSocketState
+
+from .logic import analyze_property, comparison_size_error, reanalyze_property
+from .models import (
+    AnalyzePropertiesRequest,
+    GlobalAssumptions,
+    LivePatch,
+    PropertyAnalysisResult,
+    PropertyInput,
+)
+from .responses import dumps
+
+
+logger = logging.getLogger(__name__)
+
+
+# Patches arriving within this window of the first one are applied together
+# and answered with a single update.
+COALESCE_WINDOW_SECONDS = 0.05
+
+
+class LivePatchError(ValueError):
+    pass
+
+
+def _diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    for key, value in after.items():
+        old = before.get(key)
+        if old == value:
+            continue
+        if isinstance(value, dict) and isinstance(old, dict):
+            changes[key] = {name: item for name, item in value.items() if old.get(name) != item}
+        else:
+            changes[key] = value
+    return changes
+
+
+class LiveSession:
+    """
+    Server-side comparison set for one underwrite WebSocket.
+
+    Patches mutate the inputs and mark what needs recomputing; ``flush``
+    re-scores only that and reports the result fields that actually changed.
+    Assumption-only edits go through ``reanalyze_property``.
+    """
+
+    def __init__(self, request: AnalyzePropertiesRequest) -> None:
+        size_error = comparison_size_error(request.zipCode, len(request.properties))
+        if size_error:
+            raise LivePatchError(size_error)
+
+        self.zip_code = request.zipCode
+        self.assumptions = request.globalAssumptions
+        self.properties: Dict[str, PropertyInput] = {}
+        for prop in request.properties:
+            if prop.id in self.properties:
+                raise LivePatchError(f"Duplicate property id: {prop.id}")
+            self.properties[prop.id] = prop
+        self.results: Dict[str, PropertyAnalysisResult] = {
+            prop_id: analyze_property(prop, self.assumptions, self.zip_code)
+            for prop_id, prop in self.properties.items()
+        }
+        self._dumped: Dict[str, Dict[str, Any]] = {
+            prop_id: result.model_dump() for prop_id, result in self.results.items()
+        }
+        self.ranking = self._rank()
+
+        self._scored_assumptions = self.assumptions
+        self._dirty: Set[str] = set()
+        self._removed: Set[str] = set()
+
+    def _rank(self) -> List[str]:
+        ordered = sorted(self.results.values(), key=lambda item: item.overallScore, reverse=True)
+        return [item.property.id for item in ordered]
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._dirty or self._removed) or self._scored_assumptions != self.assumptions
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "type": "snapshot",
+            "zipCode": self.zip_code,
+            "results": [self._dumped[prop_id] for prop_id in self.ranking],
+            "ranking": self.ranking,
+        }
+
+    def apply_patch(self, message: Dict[str, Any]) -> None:
+        """
+        Apply one client patch::
+
+            {"type": "patch", "zipCode": "...", "assumptions": {...},
+             "properties": {"<id>": {...}}, "add": [...], "remove": ["<id>"]}
+
+        Every key is optional. The whole patch is validated before any of it
+        is applied, so a rejected patch leaves the session untouched.
+        """
+        patch = LivePatch.model_validate(message)
+        zip_code = patch.zipCode or self.zip_code
+        assumptions = self.assumptions
+        if patch.assumptions:
+            assumptions = GlobalAssumptions.model_validate(
+                {**self.assumptions.model_dump(), **patch.assumptions}
+            )
+
+        properties = dict(self.properties)
+        dirty: Set[str] = set()
+        for prop_id in patch.remove or []:
+            if properties.pop(prop_id, None) is None:
+                raise LivePatchError(f"Unknown property id: {prop_id}")
+        for prop_id, fields in (patch.properties or {}).items():
+            if prop_id not in properties:
+                raise LivePatchError(f"Unknown property id: {prop_id}")
+            properties[prop_id] = PropertyInput.model_validate(
+                {**properties[prop_id].model_dump(), **fields, "id": prop_id}
+            )
+            dirty.add(prop_id)
+        for raw in patch.add or []:
+            prop = PropertyInput.model_validate(raw)
+            if prop.id in properties:
+                raise LivePatchError(f"Duplicate property id: {prop.id}")
+            properties[prop.id] = prop
+            dirty.add(prop.id)
+
+        size_error = comparison_size_error(zip_code, len(properties))
+        if size_error:
+            raise LivePatchError(size_error)
+
+        if zip_code != self.zip_code:
+            dirty.update(properties)
+        self._removed.update(set(self.properties) - set(properties))
+        self._removed.difference_update(properties)
+        self.zip_code = zip_code
+        self.assumptions = assumptions
+        self.properties = properties
+        self._dirty.update(dirty & set(properties))
+        self._dirty.intersection_update(properties)
+
+    def flush(self) -> Dict[str, Any]:
+        changed: Dict[str, Dict[str, Any]] = {}
+        for prop_id, prop in self.properties.items():
+            previous = self.results.get(prop_id)
+            if prop_id in self._dirty or previous is None:
+                result = analyze_property(prop, self.assumptions, self.zip_code)
+            else:
+                result = reanalyze_property(
+                    prop, previous, self._scored_assumptions, self.assumptions, self.zip_code
+                )
+            if result is previous:
+                continue
+
+            dumped = result.model_dump()
+            diff = _diff(self._dumped.get(prop_id, {}), dumped)
+            self.results[prop_id] = result
+            self._dumped[prop_id] = dumped
+            if diff:
+                changed[prop_id] = diff
+
+        removed = sorted(self._removed)
+        for prop_id in removed:
+            self.results.pop(prop_id, None)
+            self._dumped.pop(prop_id, None)
+
+        update: Dict[str, Any] = {"type": "update", "changed": changed}
+        if removed:
+            update["removed"] = removed
+        ranking = self._rank()
+        if ranking != self.ranking:
+            self.ranking = ranking
+            update["ranking"] = ranking
+
+        self._scored_assumptions = self.assumptions
+        self._dirty.clear()
+        self._removed.clear()
+        return update
+
+
+async def _send(websocket: WebSocket, message: Dict[str, Any]) -> None:
+    await websocket.send_text(dumps(message).decode("utf-8"))
+
+
+async def _handle(
+    websocket: WebSocket, session: Optional[LiveSession], raw: str
+) -> Optional[LiveSession]:
+    try:
+        message = json.loads(raw)
+        kind = message.get("type")
+        if kind == "init":
+            session = LiveSession(AnalyzePropertiesRequest.model_validate(message))
+            await _send(websocket, session.snapshot())
+        elif kind == "patch":
+            if session is None:
+                raise LivePatchError("Send an init message before patches.")
+            session.apply_patch(message)
+        else:
+            raise LivePatchError(f"Unknown message type: {kind!r}")
+    except LivePatchError as exc:
+        await _send(websocket, {"type": "error", "error": str(exc)})
+    except (ValueError, TypeError, AttributeError, ValidationError):
+        await _send(websocket, {"type": "error", "error": "Invalid request payload."})
+    return session
+
+
+async def run_live_session(
+    websocket: WebSocket, coalesce_window: float = COALESCE_WINDOW_SECONDS
+) -> None:
+    """
+    Serve one underwrite session: an ``init`` message with the full
+    ``AnalyzePropertiesRequest`` shape, then any number of ``patch`` messages.
+    Bursts of patches are coalesced and answered with a single ``update``.
+    """
+    inbox: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    async def read() -> None:
+        # Any failure here (a disconnect, a binary frame) ends the session;
+        # the sentinel is always queued so the main loop cannot hang.
+        try:
+            while True:
+                await inbox.put(await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        except Exception:
+            logger.warning("Closing underwrite session after a receive error.", exc_info=True)
+        finally:
+            inbox.put_nowait(None)
+
+    reader = asyncio.create_task(read())
+    loop = asyncio.get_running_loop()
+    session: Optional[LiveSession] = None
+    try:
+        while True:
+            raw = await inbox.get()
+            if raw is None:
+                return
+            batch = [raw]
+            closed = False
+            deadline = loop.time() + coalesce_window
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    raw = await asyncio.wait_for(inbox.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if raw is None:
+                    closed = True
+                    break
+                batch.append(raw)
+
+            for raw in batch:
+                session = await _handle(websocket, session, raw)
+            if closed:
+                return
+            if session is not None and session.has_pending:
+                await _send(websocket, session.flush())
+    finally:
+        reader.cancel()
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
@@ -0,0 +1,341 @@
+"""
+Concurrent mixed-workload load test for the API.
+
+By default the app runs in-process behind httpx's ASGI transport. mongomock,
+seeded from ``data/sample-listings.json``, stands in for Mongo, and a stub
+agent with configurable latency stands in for Agentverse. Pass ``--url`` to
+drive a running server instead. Latencies include the client side of the
+harness, which shares the process in local mode.
+
+Usage:
+    python -m backend.loadtest --concurrency 1,8,32 --duration 10
+    python -m backend.loadtest --mix analyze=6,properties=3,commentary=1 --agent-latency-ms 800
+    python -m backend.loadtest --url http://localhost:8000 --json report.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .logic import listing_to_property_input
+from .models import GlobalAssumptions, MapProperty
+
+
+ENDPOINTS = ("analyze", "properties", "commentary")
+DEFAULT_MIX = {"analyze": 5, "properties": 4, "commentary": 1}
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+SAMPLE_LISTINGS = Path(__file__).resolve().parent.parent / "data" / "sample-listings.json"
+
+_PATHS = {"analyze": "/analyze-properties", "commentary": "/api/agent-commentary"}
+
+# (endpoint, method, path, JSON body)
+LoadRequest = Tuple[str, str, str, Optional[Dict[str, Any]]]
+
+
+class LatencyHistogram:
+    """Keeps every sample (milliseconds) so percentiles are exact."""
+
+    def __init__(self) -> None:
+        self.samples: List[float] = []
+
+    def record(self, latency_ms: float) -> None:
+        self.samples.append(latency_ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    def buckets(self) -> List[Tuple[str, int]]:
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for sample in self.samples:
+            index = next(
+                (i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if sample <= bound),
+                len(HISTOGRAM_BUCKETS_MS),
+            )
+            counts[index] += 1
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        return list(zip(labels, counts))
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {"count": len(self.samples)}
+        for name, q in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("max", 1.0)):
+            value = self.percentile(q)
+            summary[name] = round(value, 2) if value is not None else None
+        return summary
+
+
+def _outcome(status: int) -> str:
+    if 200 <= status < 400:
+        return "ok"
+    if status in (429, 503):
+        return "shed"
+    return "error"
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    duration: float
+    latencies: Dict[str, LatencyHistogram] = field(
+        default_factory=lambda: {name: LatencyHistogram() for name in ENDPOINTS}
+    )
+    statuses: Dict[str, Counter] = field(default_factory=lambda: {name: Counter() for name in ENDPOINTS})
+
+    def record(self, endpoint: str, status: int, latency_ms: float) -> None:
+        self.statuses[endpoint][status] += 1
+        if _outcome(status) == "ok":
+            self.latencies[endpoint].record(latency_ms)
+
+    def outcomes(self) -> Counter:
+        outcomes: Counter = Counter()
+        for counts in self.statuses.values():
+            for status, count in counts.items():
+                outcomes[_outcome(status)] += count
+        return outcomes
+
+    @property
+    def throughput(self) -> float:
+        """Successful requests per second."""
+        return self.outcomes()["ok"] / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "durationSeconds": round(self.duration, 3),
+            "throughputPerSecond": round(self.throughput, 2),
+            "outcomes": dict(self.outcomes()),
+            "endpoints": {
+                name: {
+                    "latencyMs": self.latencies[name].summary(),
+                    "histogram": dict(self.latencies[name].buckets()),
+                    "statuses": {str(status): count for status, count in self.statuses[name].items()},
+                }
+                for name in ENDPOINTS
+            },
+        }
+
+
+class WorkloadGenerator:
+    """Draws requests from the mix, built from real sample listings."""
+
+    def __init__(
+        self,
+        listings: Sequence[Dict[str, Any]],
+        mix: Mapping[str, float] = DEFAULT_MIX,
+        seed: int = 0,
+    ) -> None:
+        unknown = set(mix) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+        self._rng = random.Random(seed)
+        self._names = [name for name in ENDPOINTS if mix.get(name, 0) > 0]
+        self._weights = [mix[name] for name in self._names]
+        self.assumptions = GlobalAssumptions()
+
+        self._deals: Dict[str, List[Dict[str, Any]]] = {}
+        for raw in listings:
+            listing = MapProperty.model_validate(raw)
+            deal = listing_to_property_input(listing, self.assumptions).model_dump()
+            self._deals.setdefault(listing.zipCode, []).append(deal)
+        self._zip_codes = sorted(self._deals)
+        self._comparable_zips = [zip_code for zip_code in self._zip_codes if len(self._deals[zip_code]) >= 2]
+
+    def _comparison(self) -> Dict[str, Any]:
+        zip_code = self._rng.choice(self._comparable_zips)
+        deals = self._rng.sample(self._deals[zip_code], self._rng.randint(2, min(5, len(self._deals[zip_code]))))
+        properties = []
+        for deal in deals:
+            # Jitter the inputs the way users tweak them between runs.
+            properties.append(
+                {
+                    **deal,
+                    "listPrice": round(deal["listPrice"] * self._rng.uniform(0.95, 1.05)),
+                    "estimatedRent": round(deal["estimatedRent"] * self._rng.uniform(0.9, 1.1)),
+                }
+            )
+        return {
+            "zipCode": zip_code,
+            "globalAssumptions": self.assumptions.model_dump(),
+            "properties": properties,
+        }
+
+    def next_request(self) -> LoadRequest:
+        endpoint = self._rng.choices(self._names, self._weights)[0]
+        if endpoint == "properties":
+            return endpoint, "GET", f"/api/properties/{self._rng.choice(self._zip_codes)}", None
+        return endpoint, "POST", _PATHS[endpoint], self._comparison()
+
+
+async def run_level(client: Any, generator: WorkloadGenerator, concurrency: int, duration: float) -> LevelResult:
+    """Run ``concurrency`` closed-loop workers against ``client`` for ``duration`` seconds."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    result = LevelResult(concurrency=concurrency, duration=duration)
+    deadline = loop.time() + duration
+
+    async def worker() -> None:
+        while loop.time() < deadline:
+            endpoint, method, path, body = generator.next_request()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            result.record(endpoint, status, (time.perf_counter() - started) * 1000)
+
+    started = loop.time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.duration = loop.time() - started
+    return result
+
+
+@contextmanager
+def local_stand_ins(listings: Sequence[Dict[str, Any]], agent_latency: float = 0.0) -> Iterator[Any]:
+    """
+    Yield ``backend.main.app`` wired to an in-memory listings collection and a
+    stub agent that sleeps ``agent_latency`` seconds. Restores both on exit.
+    """
+    import mongomock
+
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    from . import main
+
+    collection = mongomock.MongoClient().db.listings
+    collection.insert_many([dict(listing) for listing in listings])
+
+    async def stub_agent(analysis_payload: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(agent_latency)
+        return {
+            "overallSummary": analysis_payload.get("summary", ""),
+            "keyBullets": [f"Stub agent reviewed {len(analysis_payload['results'])} properties"],
+        }
+
+    original_mongo, original_agent = main.mongo, main.call_agent_with_analysis_data
+    main.mongo = collection
+    main.call_agent_with_analysis_data = stub_agent
+    main.listings_cache.clear()
+    try:
+        yield main.app
+    finally:
+        main.mongo = original_mongo
+        main.call_agent_with_analysis_data = original_agent
+        main.listings_cache.clear()
+
+
+async def run(
+    generator: WorkloadGenerator,
+    levels: Sequence[int],
+    duration: float,
+    *,
+    app: Any = None,
+    url: Optional[str] = None,
+) -> List[LevelResult]:
+    import httpx
+
+    if url:
+        transport = None
+        base_url = url
+    else:
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    results = []
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=30.0) as client:
+        for concurrency in levels:
+            results.append(await run_level(client, generator, concurrency, duration))
+    return results
+
+
+def format_report(results: Sequence[LevelResult]) -> str:
+    def ms(value: Optional[float]) -> str:
+        return f"{value:.1f}" if value is not None else "-"
+
+    header = f"{'conc':>5} {'req/s':>9} {'ok':>7} {'shed':>6} {'err':>5}"
+    for name in ENDPOINTS:
+        header += f" | {name + ' p50/p99 ms':>26}"
+    lines = [header]
+    for level in results:
+        outcomes = level.outcomes()
+        line = (
+            f"{level.concurrency:>5} {level.throughput:>9.1f} {outcomes['ok']:>7} "
+            f"{outcomes['shed']:>6} {outcomes['error']:>5}"
+        )
+        for name in ENDPOINTS:
+            histogram = level.latencies[name]
+            line += f" | {ms(histogram.percentile(0.5)) + ' / ' + ms(histogram.percentile(0.99)):>26}"
+        lines.append(line)
+
+    peak = max((level.throughput for level in results), default=0.0) or 1.0
+    lines.append("")
+    lines.append("Throughput vs concurrency")
+    for level in results:
+        bar = "#" * round(40 * level.throughput / peak)
+        lines.append(f"{level.concurrency:>5} {bar} {level.throughput:.1f}/s")
+
+    last = results[-1] if results else None
+    if last is not None:
+        lines.append("")
+        lines.append(f"Latency histograms at concurrency {last.concurrency}")
+        for name in ENDPOINTS:
+            histogram = last.latencies[name]
+            if not histogram.samples:
+                continue
+            lines.append(f"  {name}")
+            for label, count in histogram.buckets():
+                if count:
+                    lines.append(f"    {label:>9} {count:>7}")
+    return "\n".join(lines)
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mixed-workload load test for the API.")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--mix", default="analyze=5,properties=4,commentary=1")
+    parser.add_argument("--agent-latency-ms", type=float, default=500.0, help="Stub agent delay")
+    parser.add_argument("--listings", type=Path, default=SAMPLE_LISTINGS)
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", type=Path, help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    listings = json.loads(args.listings.read_text())
+    levels = [int(level) for level in args.concurrency.split(",")]
+    generator = WorkloadGenerator(listings, parse_mix(args.mix), seed=args.seed)
+
+    if args.url:
+        results = asyncio.run(run(generator, levels, args.duration, url=args.url))
+    else:
+        with local_stand_ins(listings, args.agent_latency_ms / 1000) as app:
+            results = asyncio.run(run(generator, levels, args.duration, app=app))
+
+    print(format_report(results))
+    if args.json_path:
+        args.json_path.write_text(json.dumps([level.as_dict() for level in results], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,18 +3,30 @@ from __future__ import annotations
 from dataclasses import dataclass
 from hashlib import md5
 from math import pow
-from typing import List, Literal
+from typing import Callable, Dict, List, Literal, Optional, Set
 
 from .models import (
     AgentCommentary,
     DealMetrics,
     GlobalAssumptions,
+    MapProperty,
     PropertyAnalysisResult,
     PropertyInput,
+    RentEstimate,
     YearProjection,
 )
 
 
+MIN_PROPERTIES = 2
+MAX_PROPERTIES = 5
+
+# Financing assumed when scoring raw listings, which carry no deal terms.
+LISTING_DOWN_PAYMENT_PERCENT = 20.0
+LISTING_INTEREST_RATE_PERCENT = 6.5
+LISTING_LOAN_TERM_YEARS = 30
+LISTING_CLOSING_COST_PERCENT = 3.0
+
+
 @dataclass
 class ZipDefaults:
     tax_per_year: float
@@ -22,13 +34,51 @@ class ZipDefaults:
     utilities_per_month: float
 
 
+def comparison_size_error(zip_code: str, count: int) -> Optional[str]:
+    if not zip_code or count < MIN_PROPERTIES:
+        return f"ZIP code and at least {MIN_PROPERTIES} properties are required."
+    if count > MAX_PROPERTIES:
+        return f"Maximum {MAX_PROPERTIES} properties allowed per analysis."
+    return None
+
+
 def _stable_variation(seed_text: str) -> float:
     digest = md5(seed_text.encode("utf-8")).hexdigest()
     value = int(digest[:8], 16) / 0xFFFFFFFF
     return 0.9 + value * 0.2
 
 
-def _zip_defaults(zip_code: str) -> ZipDefaults:
+ZipDefaultsProvider = Callable[[str], Optional[ZipDefaults]]
+
+_zip_defaults_provider: Optional[ZipDefaultsProvider] = None
+
+
+def set_zip_defaults_provider(provider: Optional[ZipDefaultsProvider]) -> None:
+    """
+    Let observed market data override the synthetic per-ZIP defaults. The
+    provider must not do I/O; returning ``None`` falls back to the synthetic
+    values.
+    """
+    global _zip_defaults_provider
+    _zip_defaults_provider = provider
+
+
+RentProvider = Callable[[PropertyInput, str], Optional[RentEstimate]]
+
+_rent_provider: Optional[RentProvider] = None
+
+
+def set_rent_provider(provider: Optional[RentProvider]) -> None:
+    """
+    Fill a blank ``estimatedRent`` from comparable listings; the estimate is
+    returned with the analysis as ``rentEstimate``. Same contract as
+    ``set_zip_defaults_provider``: no I/O, ``None`` leaves the rent blank.
+    """
+    global _rent_provider
+    _rent_provider = provider
+
+
+def _synthetic_zip_defaults(zip_code: str) -> ZipDefaults:
     zip_prefix = zip_code[:3] if zip_code else "000"
     base = sum(ord(ch) for ch in zip_prefix) % 7
     tax = 4200 + base * 180
@@ -37,6 +87,14 @@ def _zip_defaults(zip_code: str) -> ZipDefaults:
     return ZipDefaults(tax_per_year=tax, insurance_per_year=insurance, utilities_per_month=utilities)
 
 
+def _zip_defaults(zip_code: str) -> ZipDefaults:
+    if _zip_defaults_provider is not None:
+        defaults = _zip_defaults_provider(zip_code)
+        if defaults is not None:
+            return defaults
+    return _synthetic_zip_defaults(zip_code)
+
+
 def _mortgage_payment(principal: float, interest_rate_percent: float, term_years: int) -> float:
     if principal <= 0 or term_years <= 0:
         return 0.0
@@ -141,10 +199,32 @@ def _generate_key_bullets(
     return bullets[:5]
 
 
-def _apply_defaults(prop: PropertyInput, assumptions: GlobalAssumptions, zip_code: str) -> PropertyInput:
+def _rent_estimate(prop: PropertyInput, zip_code: str) -> Optional[RentEstimate]:
+    if prop.estimatedRent or _rent_provider is None:
+        return None
+    return _rent_provider(prop, zip_code)
+
+
+# PropertyInput fields that fall back to the ZIP defaults when left blank.
+_ZIP_DEFAULT_FIELDS = {
+    "propertyTaxPerYear": "tax_per_year",
+    "insurancePerYear": "insurance_per_year",
+    "utilitiesPerMonth": "utilities_per_month",
+}
+
+
+def _apply_defaults(
+    prop: PropertyInput,
+    assumptions: GlobalAssumptions,
+    zip_code: str,
+    rent_estimate: Optional[RentEstimate] = None,
+) -> PropertyInput:
     defaults = _zip_defaults(zip_code)
     variation = _stable_variation(f"{prop.id}:{zip_code}")
 
+    rent = prop.estimatedRent
+    if not rent and rent_estimate is not None:
+        rent = rent_estimate.estimatedRent
     vacancy_rate = prop.vacancyRatePercent or assumptions.defaultVacancyRatePercent
     maintenance = prop.maintenancePerMonth or (
         prop.listPrice * (assumptions.defaultMaintenancePercent / 100) / 12
@@ -155,6 +235,7 @@ def _apply_defaults(prop: PropertyInput, assumptions: GlobalAssumptions, zip_cod
 
     return prop.model_copy(
         update={
+            "estimatedRent": rent,
             "vacancyRatePercent": vacancy_rate,
             "maintenancePerMonth": maintenance,
             "propertyTaxPerYear": tax,
@@ -164,11 +245,36 @@ def _apply_defaults(prop: PropertyInput, assumptions: GlobalAssumptions, zip_cod
     )
 
 
-def analyze_property(
-    prop: PropertyInput, assumptions: GlobalAssumptions, zip_code: str
-) -> PropertyAnalysisResult:
-    prop = _apply_defaults(prop, assumptions, zip_code)
+@dataclass
+class _OperatingFigures:
+    loan_amount: float
+    mortgage_payment: float
+    monthly_expenses: float
+    monthly_noi: float
+    monthly_cash_flow: float
+    cap_rate: float
+    total_cash_invested: float
+    annual_cash_flow: float
+    cash_on_cash: float
 
+
+@dataclass
+class _Projection:
+    timeline: List[YearProjection]
+    total_cash_flow: float
+    equity: float
+    roi: float
+
+
+# GlobalAssumptions fields that only reach the analysis through a property
+# field left blank (falsy) by the user, keyed to that field.
+_OPERATING_ASSUMPTIONS = {
+    "defaultVacancyRatePercent": "vacancyRatePercent",
+    "defaultMaintenancePercent": "maintenancePerMonth",
+}
+
+
+def _operating_figures(prop: PropertyInput) -> _OperatingFigures:
     loan_amount = prop.listPrice - (prop.listPrice * (prop.downPaymentPercent / 100))
     mortgage_payment = _mortgage_payment(
         loan_amount, prop.interestRatePercent, prop.loanTermYears
@@ -190,8 +296,26 @@ def analyze_property(
     annual_cash_flow = monthly_cash_flow * 12
     cash_on_cash = (annual_cash_flow / total_cash_invested) * 100 if total_cash_invested else 0
 
+    return _OperatingFigures(
+        loan_amount=loan_amount,
+        mortgage_payment=mortgage_payment,
+        monthly_expenses=monthly_expenses,
+        monthly_noi=monthly_noi,
+        monthly_cash_flow=monthly_cash_flow,
+        cap_rate=cap_rate,
+        total_cash_invested=total_cash_invested,
+        annual_cash_flow=annual_cash_flow,
+        cash_on_cash=cash_on_cash,
+    )
+
+
+def _project(
+    prop: PropertyInput, ops: _OperatingFigures, assumptions: GlobalAssumptions
+) -> _Projection:
     appreciation_rate = assumptions.defaultAppreciationRatePercent / 100
     base_value = prop.arv if prop.arv > 0 else prop.listPrice
+    loan_amount = ops.loan_amount
+    total_cash_invested = ops.total_cash_invested
 
     timeline: List[YearProjection] = []
     cumulative_cash_flow = 0.0
@@ -208,7 +332,7 @@ def analyze_property(
         principal_paid = max(0.0, balance_start - balance_end)
         equity_this_year = principal_paid + (value_year - base_value) / 5
 
-        cash_flow_this_year = annual_cash_flow
+        cash_flow_this_year = ops.annual_cash_flow
         cumulative_cash_flow += cash_flow_this_year
         cumulative_equity += equity_this_year
         cumulative_roi = (
@@ -227,27 +351,100 @@ def analyze_property(
             )
         )
 
-    five_year_total_cash_flow = cumulative_cash_flow
-    five_year_equity = cumulative_equity
     five_year_roi = (
-        (five_year_total_cash_flow + five_year_equity) / total_cash_invested * 100
+        (cumulative_cash_flow + cumulative_equity) / total_cash_invested * 100
         if total_cash_invested
         else 0
     )
+    return _Projection(
+        timeline=timeline,
+        total_cash_flow=cumulative_cash_flow,
+        equity=cumulative_equity,
+        roi=five_year_roi,
+    )
+
+
+def _overall_score(metrics: DealMetrics) -> float:
+    base_score = metrics.cashOnCashReturnPercent * 0.6 + metrics.capRatePercent * 0.4
+    if metrics.riskLevel == "high":
+        base_score -= 10
+    return round(base_score + (metrics.fiveYearTotalRoiPercent / 20), 2)
+
+
+def listing_to_property_input(
+    listing: MapProperty, assumptions: GlobalAssumptions
+) -> PropertyInput:
+    """
+    Turn a stored listing into a deal using the standard listing financing
+    and the synthetic ZIP defaults for every blank operating cost, so scoring
+    it never consults the ZIP-defaults provider.
+    """
+    defaults = _synthetic_zip_defaults(listing.zipCode)
+    variation = _stable_variation(f"{listing.id}:{listing.zipCode}")
+    return PropertyInput(
+        id=listing.id,
+        nickname=listing.address,
+        address=listing.address,
+        zipCode=listing.zipCode,
+        listPrice=listing.listPrice,
+        estimatedRent=listing.estimatedRent,
+        propertyTaxPerYear=listing.propertyTaxPerYear or defaults.tax_per_year * variation,
+        insurancePerYear=listing.insurancePerYear or defaults.insurance_per_year * variation,
+        hoaPerYear=listing.hoaPerYear,
+        maintenancePerMonth=listing.listPrice * (assumptions.defaultMaintenancePercent / 100) / 12,
+        utilitiesPerMonth=defaults.utilities_per_month,
+        vacancyRatePercent=assumptions.defaultVacancyRatePercent,
+        downPaymentPercent=LISTING_DOWN_PAYMENT_PERCENT,
+        interestRatePercent=LISTING_INTEREST_RATE_PERCENT,
+        loanTermYears=LISTING_LOAN_TERM_YEARS,
+        closingCosts=listing.listPrice * LISTING_CLOSING_COST_PERCENT / 100,
+        renovationBudget=0,
+        arv=listing.listPrice,
+    )
+
 
-    risk = _risk_level(cash_on_cash, monthly_cash_flow)
-    timing = _timing_recommendation(risk, monthly_cash_flow)
+def listing_cap_rate(listing: MapProperty, assumptions: GlobalAssumptions) -> float:
+    return _operating_figures(listing_to_property_input(listing, assumptions)).cap_rate
+
+
+def analyze_listing(listing: MapProperty, assumptions: GlobalAssumptions) -> PropertyAnalysisResult:
+    """
+    Score a stored listing. Neither provider applies: a blank rent stays
+    blank, so the leaderboard, the snapshot and the export score a listing
+    the same way whichever indexes the process happens to have loaded.
+    """
+    return _analyze(listing_to_property_input(listing, assumptions), assumptions, listing.zipCode, None)
+
+
+def analyze_property(
+    prop: PropertyInput, assumptions: GlobalAssumptions, zip_code: str
+) -> PropertyAnalysisResult:
+    return _analyze(prop, assumptions, zip_code, _rent_estimate(prop, zip_code))
+
+
+def _analyze(
+    prop: PropertyInput,
+    assumptions: GlobalAssumptions,
+    zip_code: str,
+    rent_estimate: Optional[RentEstimate],
+) -> PropertyAnalysisResult:
+    prop = _apply_defaults(prop, assumptions, zip_code, rent_estimate)
+    ops = _operating_figures(prop)
+    projection = _project(prop, ops, assumptions)
+
+    risk = _risk_level(ops.cash_on_cash, ops.monthly_cash_flow)
+    timing = _timing_recommendation(risk, ops.monthly_cash_flow)
 
     metrics = DealMetrics(
-        monthlyMortgagePayment=round(mortgage_payment, 2),
-        monthlyOperatingExpenses=round(monthly_expenses, 2),
-        monthlyNOI=round(monthly_noi, 2),
-        monthlyCashFlow=round(monthly_cash_flow, 2),
-        capRatePercent=round(cap_rate, 2),
-        cashOnCashReturnPercent=round(cash_on_cash, 2),
-        fiveYearTotalRoiPercent=round(five_year_roi, 2),
-        fiveYearEquityBuilt=round(five_year_equity, 2),
-        fiveYearTotalCashFlow=round(five_year_total_cash_flow, 2),
+        monthlyMortgagePayment=round(ops.mortgage_payment, 2),
+        monthlyOperatingExpenses=round(ops.monthly_expenses, 2),
+        monthlyNOI=round(ops.monthly_noi, 2),
+        monthlyCashFlow=round(ops.monthly_cash_flow, 2),
+        capRatePercent=round(ops.cap_rate, 2),
+        cashOnCashReturnPercent=round(ops.cash_on_cash, 2),
+        fiveYearTotalRoiPercent=round(projection.roi, 2),
+        fiveYearEquityBuilt=round(projection.equity, 2),
+        fiveYearTotalCashFlow=round(projection.total_cash_flow, 2),
         riskLevel=risk,
         timingRecommendation=timing,
     )
@@ -255,28 +452,109 @@ def analyze_property(
     commentary = AgentCommentary(
         cashFlowSummary=_generate_cash_flow_summary(metrics),
         riskSummary=_generate_risk_summary(metrics),
-        marketTimingSummary=_generate_market_timing_summary(metrics, five_year_roi),
+        marketTimingSummary=_generate_market_timing_summary(metrics, projection.roi),
         renovationSummary=_generate_renovation_summary(prop),
         overallSummary=_generate_overall_summary(prop, metrics),
         keyBullets=_generate_key_bullets(metrics, timing),
     )
 
-    base_score = metrics.cashOnCashReturnPercent * 0.6 + metrics.capRatePercent * 0.4
-    if risk == "high":
-        base_score -= 10
-    overall_score = base_score + (metrics.fiveYearTotalRoiPercent / 20)
-
     return PropertyAnalysisResult(
         property=prop,
         metrics=metrics,
-        timeline=timeline,
+        timeline=projection.timeline,
         commentary=commentary,
-        overallScore=round(overall_score, 2),
+        overallScore=_overall_score(metrics),
+        rentEstimate=rent_estimate,
     )
 
 
+def changed_assumptions(previous: GlobalAssumptions, current: GlobalAssumptions) -> Set[str]:
+    return {
+        name
+        for name in GlobalAssumptions.model_fields
+        if getattr(previous, name) != getattr(current, name)
+    }
+
+
+def _needs_full_analysis(prop: PropertyInput, changed: Set[str]) -> bool:
+    for name in changed:
+        field = _OPERATING_ASSUMPTIONS.get(name)
+        # Unknown assumptions are treated as affecting everything.
+        if field is None or not getattr(prop, field):
+            return True
+    return False
+
+
+def _provider_defaults_unchanged(
+    prop: PropertyInput, previous: PropertyAnalysisResult, zip_code: str
+) -> bool:
+    """Whether the providers would still fill ``prop``'s blank fields as in ``previous``."""
+    if not prop.estimatedRent and _rent_estimate(prop, zip_code) != previous.rentEstimate:
+        return False
+    blank = [name for name in _ZIP_DEFAULT_FIELDS if not getattr(prop, name)]
+    if not blank:
+        return True
+    defaults = _zip_defaults(zip_code)
+    variation = _stable_variation(f"{prop.id}:{zip_code}")
+    return all(
+        getattr(previous.property, name) == getattr(defaults, _ZIP_DEFAULT_FIELDS[name]) * variation
+        for name in blank
+    )
+
+
+def reanalyze_property(
+    prop: PropertyInput,
+    previous: PropertyAnalysisResult,
+    previous_assumptions: GlobalAssumptions,
+    assumptions: GlobalAssumptions,
+    zip_code: str,
+) -> PropertyAnalysisResult:
+    """
+    Update ``previous`` (the result of analyzing ``prop`` under
+    ``previous_assumptions``) for new assumptions.
+
+    Vacancy and maintenance defaults only matter when ``prop`` left the
+    matching field blank; when every changed assumption is shadowed like
+    that, and the ZIP-defaults and rent providers would still fill ``prop``'s
+    blank fields as they did for ``previous``, ``previous`` is returned as
+    is. Anything else is re-analyzed in full: a whole ``analyze_property``
+    already takes well under a millisecond, and the 5-year projection an
+    appreciation change needs is most of that, so patching ``previous``
+    field by field saves little. Either way the result equals ``analyze_property`` with the
+    new assumptions.
+    """
+    changed = changed_assumptions(previous_assumptions, assumptions)
+    if _needs_full_analysis(prop, changed) or not _provider_defaults_unchanged(
+        prop, previous, zip_code
+    ):
+        return analyze_property(prop, assumptions, zip_code)
+    return previous
+
+
 def analyze_properties(
     properties: List[PropertyInput], assumptions: GlobalAssumptions, zip_code: str
 ) -> List[PropertyAnalysisResult]:
     return [analyze_property(prop, assumptions, zip_code) for prop in properties]
 
+
+def reanalyze_properties(
+    properties: List[PropertyInput],
+    previous_results: List[PropertyAnalysisResult],
+    previous_assumptions: GlobalAssumptions,
+    assumptions: GlobalAssumptions,
+    zip_code: str,
+) -> List[PropertyAnalysisResult]:
+    """Incremental ``analyze_properties``; previous results are matched by property id."""
+    previous_by_id: Dict[str, PropertyAnalysisResult] = {
+        result.property.id: result for result in previous_results
+    }
+    results = []
+    for prop in properties:
+        previous = previous_by_id.get(prop.id)
+        if previous is None:
+            results.append(analyze_property(prop, assumptions, zip_code))
+        else:
+            results.append(
+                reanalyze_property(prop, previous, previous_assumptions, assumptions, zip_code)
+            )
+    return results
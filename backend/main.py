@@ -1,20 +1,118 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException, Request
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 
+from .admission import AdmissionController, AdmissionMiddleware, PoolConfig
+from .cache import (
+    CACHE_CONTROL,
+    ZipResponseCache,
+    encoded_etag,
+    etag_matches,
+    start_change_watcher,
+)
+from .comps import CompsIndex, CompsQueryError
 from .db import MongoSettingsError, get_properties_collection
-from .logic import analyze_properties
+from .export import (
+    FORMATS as EXPORT_FORMATS,
+    MEDIA_TYPES as EXPORT_MEDIA_TYPES,
+    ExportUnavailableError,
+    export_schema,
+    score_listings,
+    score_properties,
+    stream_export,
+)
+from .listings import (
+    ListingQuery,
+    ListingQueryError,
+    fetch_page,
+    iter_listings,
+    parse_fields,
+)
+from .leaderboard import Leaderboard, LeaderboardQueryError, parse_region
+from .live import run_live_session
+from .logic import (
+    analyze_properties,
+    comparison_size_error,
+    set_rent_provider,
+    set_zip_defaults_provider,
+)
+from .market import MarketStats
 from .models import (
     AnalyzePropertiesRequest,
     AnalyzePropertiesResponse,
+    RentEstimatesRequest,
 )
+from .responses import dumps, encode_response, json_response, negotiated_encoding
+from .snapshot import SnapshotReader, SnapshotRebuilder
 
 
-app = FastAPI(title="New England Deal Underwriter API")
 mongo = get_properties_collection()
+listings_cache = ZipResponseCache()
+market_stats = MarketStats()
+leaderboard = Leaderboard()
+snapshot_path = os.getenv("LISTINGS_SNAPSHOT")
+snapshot_reader = SnapshotReader(snapshot_path) if snapshot_path else None
+snapshot_rebuilder = (
+    SnapshotRebuilder(mongo, snapshot_path)
+    if snapshot_path and os.getenv("LISTINGS_SNAPSHOT_REBUILD") == "1"
+    else None
+)
+comps = CompsIndex()
+admission = AdmissionController(
+    pools={
+        "analysis": PoolConfig.from_env("analysis", max_concurrent=8, max_queue=32),
+        "export": PoolConfig.from_env("export", max_concurrent=2, max_queue=4, queue_timeout=5.0),
+    },
+    routes={
+        ("POST", "/analyze-properties"): ("analysis", "normal"),
+        ("POST", "/api/agent-commentary"): ("analysis", "low"),
+        ("POST", "/api/export"): ("export", "low"),
+        ("GET", "/api/export/listings"): ("export", "low"),
+    },
+    trusted_proxies=int(os.getenv("ADMISSION_TRUSTED_PROXIES", "0")),
+)
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    if os.getenv("MARKET_STATS_WARM") == "1":
+        market_stats.ensure_loaded(mongo)
+        # Observed ZIP medians replace the synthetic analysis defaults only in
+        # workers that load every ZIP up front, so results never depend on
+        # which requests a worker happened to serve first.
+        set_zip_defaults_provider(market_stats.zip_defaults)
+    if os.getenv("LEADERBOARD_WARM") == "1":
+        leaderboard.ensure_loaded(mongo)
+    if os.getenv("COMPS_WARM") == "1":
+        comps.ensure_loaded(mongo)
+        # Same rule as the ZIP defaults: blank rents are filled only where the
+        # index is loaded before the first request and stays loaded.
+        set_rent_provider(comps.estimate_property_rent)
+    listeners = [market_stats.apply_change, leaderboard.apply_change, comps.apply_change]
+    if snapshot_rebuilder is not None:
+        snapshot_rebuilder.start()
+        listeners.append(snapshot_rebuilder.request)
+    stop_watcher = None
+    if os.getenv("MONGODB_WATCH_CHANGES") == "1":
+        stop_watcher = start_change_watcher(mongo, listings_cache, listeners=listeners)
+    yield
+    set_zip_defaults_provider(None)
+    set_rent_provider(None)
+    if stop_watcher is not None:
+        stop_watcher.set()
+    if snapshot_rebuilder is not None:
+        snapshot_rebuilder.stop()
+
+
+app = FastAPI(title="New England Deal Underwriter API", lifespan=_lifespan)
+app.add_middleware(AdmissionMiddleware, controller=admission)
 
 @app.exception_handler(HTTPException)
 def _http_exception_handler(_: Request, exc: HTTPException) -> JSONResponse:
@@ -27,11 +125,10 @@ def _validation_exception_handler(_: Request, exc: RequestValidationError) -> JS
 
 
 @app.post("/analyze-properties", response_model=AnalyzePropertiesResponse)
-def analyze_properties_route(payload: AnalyzePropertiesRequest):
-    if not payload.zipCode or len(payload.properties) < 2:
-        raise HTTPException(status_code=400, detail="ZIP code and at least 2 properties are required.")
-    if len(payload.properties) > 5:
-        raise HTTPException(status_code=400, detail="Maximum 5 properties allowed per analysis.")
+def analyze_properties_route(payload: AnalyzePropertiesRequest, request: Request):
+    size_error = comparison_size_error(payload.zipCode, len(payload.properties))
+    if size_error:
+        raise HTTPException(status_code=400, detail=size_error)
 
     results = analyze_properties(payload.properties, payload.globalAssumptions, payload.zipCode)
     results.sort(key=lambda item: item.overallScore, reverse=True)
@@ -43,7 +140,8 @@ def analyze_properties_route(payload: AnalyzePropertiesRequest):
         f"{top.metrics.cashOnCashReturnPercent:.1f}% cash-on-cash return and "
         f"{top.metrics.riskLevel} risk profile."
     )
-    return AnalyzePropertiesResponse(
+    # Results are built from validated models, so skip re-validating them.
+    response = AnalyzePropertiesResponse.model_construct(
         results=results,
         meta={
             "zipCode": payload.zipCode,
@@ -55,19 +153,206 @@ def analyze_properties_route(payload: AnalyzePropertiesRequest):
             },
         },
     )
+    return json_response(request, response)
+
+def _render_properties(zip_code: str) -> bytes:
+    return dumps(list(mongo.find({"zipCode": zip_code})))
+
+
+def _stream_ndjson(listings: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    for listing in listings:
+        yield dumps(listing) + b"\n"
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"},
+    )
+
+
+@app.websocket("/ws/underwrite")
+async def underwrite_session(websocket: WebSocket):
+    await websocket.accept()
+    await run_live_session(websocket)
+
 
 @app.get("/api/properties/{zip_code}")
-def get_properties(zip_code: str):
-    properties = list(mongo.find({"zipCode": zip_code}))
-    if not properties:
-        return {}
-    for prop in properties:
-        prop["_id"] = str(prop["_id"])  # Convert ObjectId to string for JSON serialization
-    return properties
+def get_properties(
+    zip_code: str,
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort: str = "_id",
+    fields: Optional[str] = None,
+    stream: bool = False,
+):
+    if limit is not None or cursor or fields or stream or sort != "_id":
+        return _query_properties(zip_code, request, limit, cursor, sort, fields, stream)
+
+    # A 304 repeats the validator of the representation this client would get.
+    if_none_match = request.headers.get("if-none-match")
+    cached = listings_cache.get(zip_code)
+    if cached is not None and etag_matches(if_none_match, cached.etag):
+        return _not_modified(
+            encoded_etag(cached.etag, negotiated_encoding(request, len(cached.body)))
+        )
+
+    entry = listings_cache.get_or_render(zip_code, lambda: _render_properties(zip_code))
+    if etag_matches(if_none_match, entry.etag):
+        return _not_modified(
+            encoded_etag(entry.etag, negotiated_encoding(request, len(entry.body)))
+        )
+
+    response = encode_response(
+        request, Response(entry.body, media_type="application/json")
+    )
+    response.headers["ETag"] = encoded_etag(
+        entry.etag, response.headers.get("content-encoding")
+    )
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _query_properties(
+    zip_code: str,
+    request: Request,
+    limit: Optional[int],
+    cursor: Optional[str],
+    sort: str,
+    fields: Optional[str],
+    stream: bool,
+):
+    try:
+        query = ListingQuery(
+            zip_code=zip_code, sort=sort, limit=limit, cursor=cursor, fields=parse_fields(fields)
+        )
+        if stream:
+            return StreamingResponse(
+                _stream_ndjson(iter_listings(mongo, query)), media_type="application/x-ndjson"
+            )
+        items, next_cursor = fetch_page(mongo, query)
+    except ListingQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return json_response(request, {"items": items, "nextCursor": next_cursor})
+
+
+@app.get("/api/market-stats/{zip_code}")
+def get_market_stats(zip_code: str, request: Request):
+    market_stats.ensure_loaded(mongo)
+    summary = market_stats.zip_summary(zip_code)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No listings found for ZIP {zip_code}.")
+    return json_response(request, summary)
+
+
+@app.get("/api/leaderboard")
+def get_leaderboard(
+    request: Request,
+    metric: str = "overallScore",
+    region: Optional[str] = None,
+    propertyType: Optional[str] = None,
+    maxPrice: Optional[float] = None,
+    limit: int = 50,
+):
+    try:
+        region_key = parse_region(region)
+        leaderboard.ensure_loaded(mongo)
+        entries = leaderboard.top(
+            metric=metric,
+            region=region_key,
+            property_type=propertyType,
+            max_price=maxPrice,
+            limit=limit,
+        )
+    except LeaderboardQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return json_response(request, {"metric": metric, "results": [entry.as_dict() for entry in entries]})
+
+
+@app.get("/api/scored-listings/{zip_code}")
+def get_scored_listings(zip_code: str, request: Request):
+    snapshot = snapshot_reader.current() if snapshot_reader is not None else None
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Scored listings snapshot is not available.")
+    return json_response(
+        request,
+        {
+            "version": snapshot.version,
+            "ageSeconds": round(snapshot.age_seconds, 1),
+            "results": snapshot.rows_for_zip(zip_code),
+        },
+    )
+
+
+def _export_response(results: Iterator[Any], fmt: str, name: str) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}.")
+    try:
+        export_schema()
+    except ExportUnavailableError as exc:
+        raise HTTPException(status_code=501, detail=str(exc)) from exc
+    extension = "arrows" if fmt == "arrow" else "parquet"
+    return StreamingResponse(
+        stream_export(results, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
+
+
+@app.post("/api/export")
+def export_analysis(payload: AnalyzePropertiesRequest, format: str = "parquet"):
+    results = score_properties(payload.properties, payload.globalAssumptions, payload.zipCode)
+    return _export_response(results, format, f"analysis-{payload.zipCode}")
+
+
+@app.get("/api/export/listings")
+def export_listings(format: str = "parquet", zipCode: Optional[str] = None):
+    results = score_listings(mongo, zip_code=zipCode)
+    return _export_response(results, format, f"listings-{zipCode or 'all'}")
+
+
+@app.post("/api/rent-estimates")
+def rent_estimates(payload: RentEstimatesRequest, request: Request):
+    comps.ensure_loaded(mongo)
+    queries = [comps.query_for_subject(subject) for subject in payload.subjects]
+    try:
+        estimates = comps.estimate_many(queries, payload.k)
+    except CompsQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return json_response(
+        request, {"estimates": [estimate.model_dump() if estimate else None for estimate in estimates]}
+    )
+
+
+@app.get("/api/admission")
+def admission_stats():
+    return admission.stats()
+
+
+@app.post("/api/properties/refresh")
+def refresh_all_properties():
+    listings_cache.clear()
+    for index in (market_stats, leaderboard, comps):
+        index.refresh(mongo)
+    if snapshot_rebuilder is not None:
+        snapshot_rebuilder.request()
+    return {"refreshed": "all"}
+
+
+@app.post("/api/properties/{zip_code}/refresh")
+def refresh_properties(zip_code: str):
+    listings_cache.invalidate(zip_code)
+    for index in (market_stats, leaderboard, comps):
+        index.refresh(mongo, zip_code)
+    if snapshot_rebuilder is not None:
+        snapshot_rebuilder.request()
+    return {"refreshed": zip_code, "version": listings_cache.version(zip_code)}
 
-from .agent.agent import AgentverseClient
-import httpx
-from typing import Dict, Any
+# The Agentverse client (and the uagents stack behind it) is deliberately not
+# imported here: ``backend.agent`` loads it on first attribute access, so
+# workers that never serve agent traffic skip it on cold start.
 
 
 async def call_agent_with_analysis_data(analysis_payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -130,10 +415,9 @@ async def get_agent_commentary(payload: AnalyzePropertiesRequest):
     This endpoint combines property analysis with agent insights.
     """
     # First, run the property analysis
-    if not payload.zipCode or len(payload.properties) < 2:
-        raise HTTPException(status_code=400, detail="ZIP code and at least 2 properties are required.")
-    if len(payload.properties) > 5:
-        raise HTTPException(status_code=400, detail="Maximum 5 properties allowed per analysis.")
+    size_error = comparison_size_error(payload.zipCode, len(payload.properties))
+    if size_error:
+        raise HTTPException(status_code=400, detail=size_error)
 
     results = analyze_properties(payload.properties, payload.globalAssumptions, payload.zipCode)
     results.sort(key=lambda item: item.overallScore, reverse=True)
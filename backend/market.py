@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .listings import ListingIndex
+from .logic import ZipDefaults, _synthetic_zip_defaults, listing_cap_rate
+from .models import GlobalAssumptions, MapProperty
+
+
+QUANTILES = (("p10", 0.10), ("p25", 0.25), ("median", 0.50), ("p75", 0.75), ("p90", 0.90))
+METRICS = (
+    "listPrice",
+    "estimatedRent",
+    "rentToPricePercent",
+    "capRatePercent",
+    "pricePerSqft",
+    "propertyTaxPerYear",
+    "insurancePerYear",
+)
+
+
+class _Distribution:
+    """Sorted values plus a running sum; exact quantiles and O(log n) lookups."""
+
+    def __init__(self) -> None:
+        self.values: List[float] = []
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        insort(self.values, value)
+        self.total += value
+
+    def remove(self, value: float) -> None:
+        index = bisect_left(self.values, value)
+        if index < len(self.values) and self.values[index] == value:
+            del self.values[index]
+            self.total -= value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.values:
+            return None
+        position = q * (len(self.values) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self.values) - 1)
+        weight = position - lower
+        return self.values[lower] * (1 - weight) + self.values[upper] * weight
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        count = len(self.values)
+        summary: Dict[str, Optional[float]] = {"mean": round(self.total / count, 2) if count else None}
+        for name, q in QUANTILES:
+            value = self.quantile(q)
+            summary[name] = round(value, 2) if value is not None else None
+        return summary
+
+
+@dataclass
+class _Aggregate:
+    inventory: int = 0
+    metrics: Dict[str, _Distribution] = field(
+        default_factory=lambda: {name: _Distribution() for name in METRICS}
+    )
+
+    def add(self, values: Dict[str, float]) -> None:
+        self.inventory += 1
+        for name, value in values.items():
+            self.metrics[name].add(value)
+
+    def remove(self, values: Dict[str, float]) -> None:
+        self.inventory -= 1
+        for name, value in values.items():
+            self.metrics[name].remove(value)
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {"inventory": self.inventory}
+        for name, distribution in self.metrics.items():
+            summary[name] = distribution.summary()
+        return summary
+
+
+@dataclass
+class _Contribution:
+    zip_code: str
+    property_type: str
+    values: Dict[str, float]
+
+
+def _listing_values(listing: MapProperty, assumptions: GlobalAssumptions) -> Dict[str, float]:
+    values = {
+        "listPrice": listing.listPrice,
+        "estimatedRent": listing.estimatedRent,
+        "capRatePercent": listing_cap_rate(listing, assumptions),
+        "propertyTaxPerYear": listing.propertyTaxPerYear,
+        "insurancePerYear": listing.insurancePerYear,
+    }
+    if listing.listPrice > 0:
+        values["rentToPricePercent"] = listing.estimatedRent * 12 / listing.listPrice * 100
+    if listing.sqft > 0:
+        values["pricePerSqft"] = listing.listPrice / listing.sqft
+    return values
+
+
+class MarketStats(ListingIndex):
+    """
+    Per-ZIP and per-ZIP/propertyType aggregates over the listings.
+
+    Loaded from Mongo once and then maintained incrementally: ``upsert`` and
+    ``remove`` move a single listing's contribution between groups.
+    """
+
+    def __init__(self, assumptions: Optional[GlobalAssumptions] = None) -> None:
+        super().__init__()
+        self.assumptions = assumptions or GlobalAssumptions()
+        # ZIP -> propertyType (None for all types) -> aggregate
+        self._groups: Dict[str, Dict[Optional[str], _Aggregate]] = {}
+        self._listings: Dict[str, _Contribution] = {}
+
+    def _group(self, zip_code: str, property_type: Optional[str]) -> _Aggregate:
+        groups = self._groups.setdefault(zip_code, {})
+        group = groups.get(property_type)
+        if group is None:
+            group = groups[property_type] = _Aggregate()
+        return group
+
+    def _discard(self, listing_id: str) -> None:
+        previous = self._listings.pop(listing_id, None)
+        if previous is None:
+            return
+        for property_type in (None, previous.property_type):
+            groups = self._groups[previous.zip_code]
+            group = groups[property_type]
+            group.remove(previous.values)
+            if group.inventory == 0:
+                del groups[property_type]
+        if not self._groups[previous.zip_code]:
+            del self._groups[previous.zip_code]
+
+    def _add(self, listing: MapProperty) -> None:
+        contribution = _Contribution(
+            zip_code=listing.zipCode,
+            property_type=listing.propertyType,
+            values=_listing_values(listing, self.assumptions),
+        )
+        self._listings[listing.id] = contribution
+        for property_type in (None, listing.propertyType):
+            self._group(listing.zipCode, property_type).add(contribution.values)
+
+    def _clear(self) -> None:
+        self._groups.clear()
+        self._listings.clear()
+
+    def zip_summary(self, zip_code: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            groups = self._groups.get(zip_code)
+            if groups is None:
+                return None
+            summary = {"zipCode": zip_code, **groups[None].summary()}
+            summary["byPropertyType"] = {
+                property_type: groups[property_type].summary()
+                for property_type in sorted(name for name in groups if name is not None)
+            }
+            return summary
+
+    def zip_defaults(self, zip_code: str) -> Optional[ZipDefaults]:
+        """
+        Observed median tax and insurance for a ZIP. Never touches Mongo, so
+        it is safe as a ``logic`` defaults provider once the stats are loaded.
+        """
+        with self._lock:
+            groups = self._groups.get(zip_code)
+            if groups is None:
+                return None
+            group = groups[None]
+            tax = group.metrics["propertyTaxPerYear"].quantile(0.5)
+            insurance = group.metrics["insurancePerYear"].quantile(0.5)
+        synthetic = _synthetic_zip_defaults(zip_code)
+        return ZipDefaults(
+            tax_per_year=tax if tax else synthetic.tax_per_year,
+            insurance_per_year=insurance if insurance else synthetic.insurance_per_year,
+            utilities_per_month=synthetic.utilities_per_month,
+        )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -64,12 +64,23 @@ class AgentCommentary(BaseModel):
     keyBullets: List[str]
 
 
+class RentEstimate(BaseModel):
+    """Similarity-weighted rent of the nearest comps with a 95% prediction interval."""
+
+    estimatedRent: float
+    low: float
+    high: float
+    compIds: List[str]
+
+
 class PropertyAnalysisResult(BaseModel):
     property: PropertyInput
     metrics: DealMetrics
     timeline: List[YearProjection]
     commentary: AgentCommentary
     overallScore: float
+    # Set when a blank estimatedRent was filled from comparable listings.
+    rentEstimate: Optional[RentEstimate] = None
 
 
 class AnalyzePropertiesRequest(BaseModel):
@@ -80,7 +91,7 @@ class AnalyzePropertiesRequest(BaseModel):
 
 class AnalyzePropertiesResponse(BaseModel):
     results: List[PropertyAnalysisResult]
-    meta: Dict[str, str]
+    meta: Dict[str, Any]
 
 
 class MapProperty(BaseModel):
@@ -101,3 +112,30 @@ class MapProperty(BaseModel):
     hoaPerYear: float
     imageUrl: Optional[str] = None
 
+
+class RentEstimateSubject(BaseModel):
+    """Located by ``lat``/``lng`` when given, otherwise by the ZIP's listings."""
+
+    zipCode: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    listPrice: Optional[float] = Field(None, gt=0)
+    sqft: Optional[int] = Field(None, gt=0)
+    bedrooms: Optional[int] = Field(None, ge=0)
+    propertyType: Optional[Literal["single-family", "multi-family", "condo", "townhouse"]] = None
+
+
+class RentEstimatesRequest(BaseModel):
+    subjects: List[RentEstimateSubject] = Field(..., min_length=1, max_length=1000)
+    k: Optional[int] = None
+
+
+class LivePatch(BaseModel):
+    """A ``patch`` message on the underwrite WebSocket; every key is optional."""
+
+    type: Literal["patch"] = "patch"
+    zipCode: Optional[str] = None
+    assumptions: Optional[Dict[str, Any]] = None
+    properties: Optional[Dict[str, Dict[str, Any]]] = None
+    add: Optional[List[Dict[str, Any]]] = None
+    remove: Optional[List[str]] = None
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import gzip
+import json
+from typing import Any, Dict, Mapping, Optional
+
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+COMPRESSION_MIN_BYTES = 1024
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize a response body without going through ``jsonable_encoder``.
+
+    Pydantic models are dumped straight from the model core; everything else
+    (Mongo documents included) goes through orjson when it is installed.
+    """
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    codings: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        name, *params = token.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[name] = quality
+    return codings
+
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    """Highest-q supported coding, brotli first on ties; ``q=0`` means refused."""
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in ("br", "gzip") if brotli is not None else ("gzip",):
+        quality = codings.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def negotiated_encoding(request: Request, size: int) -> Optional[str]:
+    """The coding ``encode_response`` would apply to a body of ``size`` bytes."""
+    if size < COMPRESSION_MIN_BYTES:
+        return None
+    return _pick_encoding(request.headers.get("accept-encoding", ""))
+
+
+def encode_response(request: Request, response: Response) -> Response:
+    """
+    Compress a rendered response with brotli or gzip when the client accepts
+    it and the body is large enough to be worth the CPU.
+    """
+    encoding = negotiated_encoding(request, len(response.body))
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        response.body = brotli.compress(response.body)
+    else:
+        response.body = gzip.compress(response.body, compresslevel=6)
+    response.headers["content-encoding"] = encoding
+    response.headers["content-length"] = str(len(response.body))
+    response.headers.add_vary_header("Accept-Encoding")
+    return response
+
+
+def json_response(
+    request: Request,
+    content: Any,
+    *,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Build a ``FastJSONResponse`` and compress it if negotiated."""
+    response = FastJSONResponse(content, status_code=status_code, headers=headers)
+    return encode_response(request, response)
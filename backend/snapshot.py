@@ -0,0 +1,405 @@
+"""
+Read-only, memory-mapped snapshot of scored listings shared by all workers.
+
+Layout (little-endian, every section 8-byte aligned)::
+
+    header   magic, format, snapshot version, row count, column count
+    columns  name, kind, offset, length   (one entry per column)
+    data     float64/int64 arrays, or uint32 offsets + UTF-8 blob for strings
+
+Rows are sorted by ZIP code, so a ZIP lookup is a binary search over the
+``zipCode`` column followed by a contiguous slice. Rebuilds write a new file
+next to the old one and ``os.replace`` it into place; readers notice the new
+inode and remap without restarting. ``SnapshotRebuilder`` triggers rebuilds
+from inside the API after listings change.
+
+Usage:
+    python -m backend.snapshot build data/listings.snap
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo.collection import Collection
+
+from .db import get_properties_collection
+from .listings import iter_valid_listings
+from .logic import analyze_listing
+from .models import GlobalAssumptions, MapProperty
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - rebuilds are not serialized across workers on Windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"EAISNAP\x00"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQI4x")
+_COLUMN = struct.Struct("<32sB7xQQ")
+_FLOAT, _INT, _STRING = ord("f"), ord("i"), ord("s")
+
+STRING_COLUMNS = ("id", "address", "zipCode", "propertyType", "imageUrl")
+INT_COLUMNS = ("bedrooms", "bathrooms", "sqft", "yearBuilt")
+FLOAT_COLUMNS = (
+    "lat",
+    "lng",
+    "listPrice",
+    "estimatedRent",
+    "propertyTaxPerYear",
+    "insurancePerYear",
+    "hoaPerYear",
+    "overallScore",
+    "cashOnCashReturnPercent",
+    "capRatePercent",
+    "monthlyCashFlow",
+)
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def _pad(size: int) -> int:
+    return (-size) % 8
+
+
+def _scored_rows(
+    listings: Iterable[MapProperty], assumptions: GlobalAssumptions
+) -> List[Dict[str, Any]]:
+    rows = []
+    for listing in listings:
+        result = analyze_listing(listing, assumptions)
+        row = listing.model_dump()
+        row["imageUrl"] = row["imageUrl"] or ""
+        row["overallScore"] = result.overallScore
+        row["cashOnCashReturnPercent"] = result.metrics.cashOnCashReturnPercent
+        row["capRatePercent"] = result.metrics.capRatePercent
+        row["monthlyCashFlow"] = result.metrics.monthlyCashFlow
+        rows.append(row)
+    rows.sort(key=lambda row: (row["zipCode"], row["id"]))
+    return rows
+
+
+def _encode_column(kind: int, values: Sequence[Any]) -> bytes:
+    if kind == _FLOAT:
+        return array("d", values).tobytes()
+    if kind == _INT:
+        return array("q", values).tobytes()
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets.tobytes() + bytes(blob)
+
+
+def write_snapshot(
+    path: Path,
+    listings: Iterable[MapProperty],
+    *,
+    assumptions: Optional[GlobalAssumptions] = None,
+    version: Optional[int] = None,
+) -> int:
+    """
+    Score ``listings`` and atomically replace the snapshot at ``path``.
+    Returns the snapshot version written into the header.
+    """
+    rows = _scored_rows(listings, assumptions or GlobalAssumptions())
+    version = version if version is not None else time.time_ns()
+
+    columns: List[Tuple[str, int]] = (
+        [(name, _STRING) for name in STRING_COLUMNS]
+        + [(name, _INT) for name in INT_COLUMNS]
+        + [(name, _FLOAT) for name in FLOAT_COLUMNS]
+    )
+    offset = _HEADER.size + _COLUMN.size * len(columns)
+    directory = bytearray()
+    sections = []
+    for name, kind in columns:
+        data = _encode_column(kind, [row[name] for row in rows])
+        directory += _COLUMN.pack(name.encode("ascii"), kind, offset, len(data))
+        sections.append(data + b"\x00" * _pad(len(data)))
+        offset += len(sections[-1])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, version, len(rows), len(columns)))
+            handle.write(directory)
+            for section in sections:
+                handle.write(section)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return version
+
+
+def build_from_collection(
+    collection: Collection[Dict[str, Any]],
+    path: Path,
+    *,
+    assumptions: Optional[GlobalAssumptions] = None,
+) -> int:
+    """
+    Snapshot every valid listing. The version is the time the read from
+    Mongo started, so any change made before it is included.
+    """
+    version = time.time_ns()
+    listings = list(iter_valid_listings(collection))
+    return write_snapshot(path, listings, assumptions=assumptions, version=version)
+
+
+class _StringColumn(Sequence[str]):
+    """Decodes one string at a time straight out of the mapping."""
+
+    def __init__(self, buffer: memoryview, rows: int) -> None:
+        self._offsets = buffer[: (rows + 1) * 4].cast("I")
+        self._blob = buffer[(rows + 1) * 4 :]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return str(self._blob[self._offsets[index] : self._offsets[index + 1]], "utf-8")
+
+
+@dataclass
+class _FileIdentity:
+    device: int
+    inode: int
+    mtime_ns: int
+
+
+class Snapshot:
+    """One mapped snapshot file. Column accessors are zero-copy views."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = _FileIdentity(stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+        buffer = memoryview(self._mmap)
+        if len(buffer) < _HEADER.size:
+            raise SnapshotFormatError(f"{path} is truncated.")
+        magic, fmt, _, self.version, self.rows, column_count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise SnapshotFormatError(f"{path} is not a listings snapshot (format {FORMAT_VERSION}).")
+        if _HEADER.size + column_count * _COLUMN.size > len(buffer):
+            raise SnapshotFormatError(f"{path} is truncated.")
+
+        self._columns: Dict[str, Any] = {}
+        for index in range(column_count):
+            raw_name, kind, offset, length = _COLUMN.unpack_from(buffer, _HEADER.size + index * _COLUMN.size)
+            name = raw_name.rstrip(b"\x00").decode("ascii", errors="replace")
+            if offset % 8 or offset + length > len(buffer):
+                raise SnapshotFormatError(f"{path} is truncated or corrupt (column {name}).")
+            section = buffer[offset : offset + length]
+            if kind in (_FLOAT, _INT):
+                if length != self.rows * 8:
+                    raise SnapshotFormatError(f"{path} has a malformed column {name}.")
+                self._columns[name] = section.cast("d" if kind == _FLOAT else "q")
+            elif kind == _STRING and length >= (self.rows + 1) * 4:
+                self._columns[name] = _StringColumn(section, self.rows)
+            else:
+                raise SnapshotFormatError(f"{path} has a malformed column {name}.")
+
+        missing = set(STRING_COLUMNS + INT_COLUMNS + FLOAT_COLUMNS) - set(self._columns)
+        if missing:
+            raise SnapshotFormatError(f"{path} is missing columns: {', '.join(sorted(missing))}.")
+
+    @property
+    def age_seconds(self) -> float:
+        """Seconds since the file was written."""
+        return max(0.0, time.time() - self.identity.mtime_ns / 1e9)
+
+    def column(self, name: str) -> Sequence[Any]:
+        return self._columns[name]
+
+    def zip_range(self, zip_code: str) -> range:
+        zips = self._columns["zipCode"]
+        return range(bisect_left(zips, zip_code), bisect_right(zips, zip_code))
+
+    def row(self, index: int) -> Dict[str, Any]:
+        row = {name: column[index] for name, column in self._columns.items()}
+        row["imageUrl"] = row["imageUrl"] or None
+        return row
+
+    def rows_for_zip(self, zip_code: str) -> List[Dict[str, Any]]:
+        return [self.row(index) for index in self.zip_range(zip_code)]
+
+
+class SnapshotReader:
+    """
+    Per-worker handle on the shared snapshot path. ``current()`` re-stats the
+    path at most every ``check_interval`` seconds and remaps when a rebuild
+    has swapped in a new file. Old mappings are released once no request
+    still holds them.
+    """
+
+    def __init__(self, path: Path, check_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[Snapshot]:
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return self._snapshot
+            identity = _FileIdentity(stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            if self._snapshot is None or self._snapshot.identity != identity:
+                try:
+                    self._snapshot = Snapshot(self.path)
+                except (OSError, ValueError):
+                    logger.exception("Could not map listings snapshot %s", self.path)
+            return self._snapshot
+
+
+def _read_version(path: Path) -> int:
+    try:
+        with open(path, "rb") as handle:
+            header = handle.read(_HEADER.size)
+        magic, fmt, _, version, _, _ = _HEADER.unpack(header)
+    except (OSError, struct.error):
+        return 0
+    return version if magic == MAGIC and fmt == FORMAT_VERSION else 0
+
+
+class SnapshotRebuilder:
+    """
+    Rebuilds the snapshot in a background thread after listings change.
+
+    ``request()`` is cheap enough to call on every change event. A rebuild
+    starts once no request has arrived for ``debounce`` seconds, or
+    ``max_delay`` seconds after the first pending one. Workers sharing the
+    path take turns through a lock file, and a worker skips its rebuild when
+    another worker's already started reading Mongo after its first pending
+    change.
+    """
+
+    def __init__(
+        self,
+        collection: Collection[Dict[str, Any]],
+        path: Path,
+        *,
+        debounce: float = 5.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.collection = collection
+        self.path = Path(path)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._wake = threading.Condition()
+        self._pending_since: Optional[float] = None
+        self._pending_since_ns = 0
+        self._last_request = 0.0
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="snapshot-rebuilder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._wake:
+            self._stopped = True
+            self._wake.notify()
+
+    def request(self, *_: Any) -> None:
+        with self._wake:
+            self._last_request = time.monotonic()
+            if self._pending_since is None:
+                self._pending_since = self._last_request
+                self._pending_since_ns = time.time_ns()
+            self._wake.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._wake:
+                while not self._stopped:
+                    if self._pending_since is None:
+                        self._wake.wait()
+                        continue
+                    due = min(self._last_request + self.debounce, self._pending_since + self.max_delay)
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(remaining)
+                if self._stopped:
+                    return
+                since_ns = self._pending_since_ns
+                self._pending_since = None
+            try:
+                self.rebuild(since_ns)
+            except Exception:
+                logger.exception("Rebuilding listings snapshot %s failed", self.path)
+
+    def rebuild(self, since_ns: int = 0) -> Optional[int]:
+        """Rebuild unless the snapshot already includes changes made at ``since_ns``."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(f".{self.path.name}.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if since_ns and _read_version(self.path) >= since_ns:
+                return None
+            started = time.perf_counter()
+            version = build_from_collection(self.collection, self.path)
+            logger.info("Rebuilt listings snapshot v%d in %.2fs", version, time.perf_counter() - started)
+            return version
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the shared scored-listings snapshot.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Score every listing in Mongo into a snapshot")
+    build.add_argument("path", type=Path)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    started = time.perf_counter()
+    version = build_from_collection(get_properties_collection(), args.path)
+    snapshot = Snapshot(args.path)
+    logger.info(
+        "Wrote snapshot v%d with %d listings to %s in %.2fs",
+        version,
+        snapshot.rows,
+        args.path,
+        time.perf_counter() - started,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
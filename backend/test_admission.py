@@ -0,0 +1,219 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from . import main
+from .admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    ClientRateLimiter,
+    ConcurrencyLimiter,
+    Overloaded,
+    PoolConfig,
+)
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestConcurrencyLimiter:
+    """Test suite for the per-pool concurrency limiter"""
+
+    def test_sheds_when_queue_full(self):
+        """Test that requests beyond slots plus queue fail fast"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(PoolConfig(max_concurrent=1, max_queue=1))
+            await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded) as exc:
+                await limiter.acquire()
+            limiter.release(0.01)
+            await waiter
+            return limiter, exc.value
+
+        limiter, exc = _run(scenario())
+        assert exc.reason == "queue_full"
+        assert exc.retry_after >= 1
+        assert limiter.active == 1
+        assert limiter.admitted == 2
+        assert limiter.shed["queue_full"] == 1
+
+    def test_higher_priority_served_first(self):
+        """Test that a freed slot goes to the highest-priority waiter"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(PoolConfig(max_concurrent=1, max_queue=4))
+            order = []
+
+            async def request(name, priority):
+                await limiter.acquire(priority)
+                order.append(name)
+                limiter.release()
+
+            await limiter.acquire()
+            tasks = [
+                asyncio.create_task(request("low", "low")),
+                asyncio.create_task(request("normal", "normal")),
+                asyncio.create_task(request("high", "high")),
+            ]
+            await asyncio.sleep(0)
+            assert limiter.queued == 3
+            limiter.release()
+            await asyncio.gather(*tasks)
+            return limiter, order
+
+        limiter, order = _run(scenario())
+        assert order == ["high", "normal", "low"]
+        assert limiter.active == 0
+
+    def test_low_priority_gets_half_the_queue(self):
+        """Test that low-priority work cannot fill the whole queue"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(PoolConfig(max_concurrent=1, max_queue=2))
+            await limiter.acquire()
+            waiter = asyncio.create_task(limiter.acquire("low"))
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded):
+                await limiter.acquire("low")
+            normal = asyncio.create_task(limiter.acquire("normal"))
+            await asyncio.sleep(0)
+            queued = limiter.queued
+            waiter.cancel()
+            normal.cancel()
+            return queued
+
+        assert _run(scenario()) == 2
+
+    def test_queue_timeout(self):
+        """Test that waiters give up after the queue timeout"""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(PoolConfig(max_concurrent=1, max_queue=1, queue_timeout=0.01))
+            await limiter.acquire()
+            with pytest.raises(Overloaded) as exc:
+                await limiter.acquire()
+            return limiter, exc.value
+
+        limiter, exc = _run(scenario())
+        assert exc.reason == "queue_timeout"
+        assert limiter.queued == 0
+        assert limiter.shed["queue_timeout"] == 1
+
+
+class TestClientRateLimiter:
+    """Test suite for per-client token buckets"""
+
+    def test_burst_then_refill(self):
+        """Test that a client gets its burst, then waits for refill"""
+        limiter = ClientRateLimiter(rate=2.0, burst=2)
+        assert limiter.check("a", now=0.0) == 0
+        assert limiter.check("a", now=0.0) == 0
+        assert limiter.check("a", now=0.0) == pytest.approx(0.5)
+        assert limiter.check("b", now=0.0) == 0
+        assert limiter.check("a", now=0.5) == 0
+
+    def test_forgets_oldest_clients(self):
+        """Test that tracked clients are bounded"""
+        limiter = ClientRateLimiter(rate=1.0, burst=1, max_clients=2)
+        for client in ("a", "b", "c"):
+            limiter.check(client, now=0.0)
+        assert limiter.check("a", now=0.0) == 0
+
+
+class TestClientKey:
+    """Test suite for identifying clients behind proxies"""
+
+    @staticmethod
+    def _scope(*forwarded):
+        headers = [(b"x-forwarded-for", value.encode("latin-1")) for value in forwarded]
+        return {"type": "http", "headers": headers, "client": ("10.0.0.1", 5000)}
+
+    def test_ignores_forwarded_without_trusted_proxies(self):
+        """Test that X-Forwarded-For is ignored by default"""
+        controller = AdmissionController(pools={}, routes={})
+        assert controller.client_key(self._scope("1.2.3.4")) == "10.0.0.1"
+
+    def test_uses_entry_added_by_trusted_proxy(self):
+        """Test that spoofed entries on the left are not used as the client key"""
+        controller = AdmissionController(pools={}, routes={}, trusted_proxies=1)
+        assert controller.client_key(self._scope("6.6.6.6, 1.2.3.4")) == "1.2.3.4"
+
+        controller = AdmissionController(pools={}, routes={}, trusted_proxies=2)
+        assert controller.client_key(self._scope("6.6.6.6, 1.2.3.4", "172.16.0.1")) == "1.2.3.4"
+        assert controller.client_key(self._scope("1.2.3.4")) == "1.2.3.4"
+        assert controller.client_key(self._scope()) == "10.0.0.1"
+
+
+class TestAdmissionMiddleware:
+    """Test suite for admission control on HTTP routes"""
+
+    def _client(self, **config):
+        app = FastAPI()
+
+        @app.post("/expensive")
+        def expensive():
+            return {"ok": True}
+
+        @app.get("/cheap")
+        def cheap():
+            return {"ok": True}
+
+        controller = AdmissionController(
+            pools={"analysis": PoolConfig(max_concurrent=1, max_queue=0, **config)},
+            routes={("POST", "/expensive"): ("analysis", "normal")},
+        )
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+        return TestClient(app), controller
+
+    def test_rate_limited_clients_get_429(self):
+        """Test that per-client limits answer 429 with Retry-After"""
+        client, controller = self._client(client_rate=0.001, client_burst=1)
+
+        assert client.post("/expensive").status_code == 200
+        response = client.post("/expensive")
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json() == {"error": "Too many requests."}
+        assert client.get("/cheap").status_code == 200
+        assert controller.stats()["analysis"]["shed"]["rate_limited"] == 1
+
+    def test_saturated_pool_gets_503(self):
+        """Test that a saturated pool sheds with 503 and leaves other routes alone"""
+        client, controller = self._client()
+        controller.pools["analysis"].limiter.active = 1
+
+        response = client.post("/expensive")
+
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+        assert client.get("/cheap").status_code == 200
+
+    def test_slot_released_after_response(self):
+        """Test that slots are returned once the response is sent"""
+        client, controller = self._client()
+        for _ in range(3):
+            assert client.post("/expensive").status_code == 200
+        stats = controller.stats()["analysis"]
+        assert stats["active"] == 0
+        assert stats["admitted"] == 3
+
+    def test_stats_endpoint(self):
+        """Test that queue depth and shed counts are exposed"""
+        response = TestClient(main.app).get("/api/admission")
+        assert response.status_code == 200
+        assert set(response.json()) == {"analysis", "export"}
+        assert {"active", "queued", "shed"} <= set(response.json()["analysis"])
+
+    def test_pool_config_from_env(self, monkeypatch):
+        """Test that pool limits can be overridden from the environment"""
+        monkeypatch.setenv("ADMISSION_ANALYSIS_CONCURRENCY", "3")
+        monkeypatch.setenv("ADMISSION_ANALYSIS_CLIENT_RATE", "5")
+        config = PoolConfig.from_env("analysis", max_concurrent=8, max_queue=32)
+        assert (config.max_concurrent, config.max_queue, config.client_rate) == (3, 32, 5.0)
@@ -0,0 +1,152 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from . import main
+from .cache import ZipResponseCache, _apply_change, etag_matches, make_etag
+
+
+class TestZipResponseCache:
+    """Test suite for the per-ZIP listings response cache"""
+
+    def test_render_is_cached_until_invalidated(self):
+        """Test that a ZIP is rendered once per version"""
+        cache = ZipResponseCache()
+        calls = []
+
+        def render():
+            calls.append(1)
+            return b"[]"
+
+        first = cache.get_or_render("02118", render)
+        second = cache.get_or_render("02118", render)
+        cache.invalidate("02118")
+        third = cache.get_or_render("02118", render)
+
+        assert first is second
+        assert third.version == first.version + 1
+        assert len(calls) == 2
+
+    def test_racing_render_is_not_stored(self):
+        """Test that a render overtaken by an invalidation is not cached"""
+        cache = ZipResponseCache()
+
+        def render():
+            cache.invalidate("02118")
+            return b"[]"
+
+        cache.get_or_render("02118", render)
+        assert cache.get("02118") is None
+
+    def test_lru_eviction(self):
+        """Test that the oldest ZIP is evicted past max_entries"""
+        cache = ZipResponseCache(max_entries=2)
+        for zip_code in ("02118", "02134", "06103"):
+            cache.get_or_render(zip_code, lambda: b"[]")
+        assert cache.get("02118") is None
+        assert cache.get("06103") is not None
+
+    def test_entries_expire_after_max_age(self):
+        """Test that a worker which missed a refresh re-renders after max_age"""
+        now = [0.0]
+        cache = ZipResponseCache(max_age=60, clock=lambda: now[0])
+        first = cache.get_or_render("02118", lambda: b"[]")
+
+        now[0] = 59.0
+        assert cache.get("02118") is first
+        now[0] = 60.0
+        assert cache.get("02118") is None
+        assert cache.get_or_render("02118", lambda: b"[1]").body == b"[1]"
+
+    def test_etag_matches_encoded_variants(self):
+        """Test that If-None-Match accepts any content-coding of the etag"""
+        etag = make_etag(b"[]")
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", {etag[:-1]}-gzip"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
+
+    def test_change_stream_zip_move_clears_everything(self):
+        """Test that changes with an unknown old ZIP drop the whole cache"""
+        cache = ZipResponseCache()
+        cache.get_or_render("02118", lambda: b"[]")
+        cache.get_or_render("02134", lambda: b"[]")
+
+        _apply_change(cache, {"fullDocument": {"zipCode": "02118"}})
+        assert cache.get("02118") is None
+        assert cache.get("02134") is not None
+
+        _apply_change(cache, {"operationType": "delete"})
+        assert cache.get("02134") is None
+
+
+class TestGetPropertiesCaching:
+    """Test suite for conditional GETs on /api/properties/{zip_code}"""
+
+    @pytest.fixture
+    def client(self, listings_collection, monkeypatch):
+        listings_collection.insert_many(
+            [
+                {"id": "prop-0001", "zipCode": "02118", "listPrice": 750000},
+                {"id": "prop-0002", "zipCode": "02118", "listPrice": 640000},
+            ]
+        )
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "listings_cache", ZipResponseCache())
+        return TestClient(main.app), listings_collection
+
+    def test_if_none_match_skips_mongo(self, client, monkeypatch):
+        """Test that a matching validator returns 304 without querying"""
+        client, collection = client
+        first = client.get("/api/properties/02118")
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == main.CACHE_CONTROL
+
+        def fail(*args, **kwargs):
+            raise AssertionError("Mongo should not be queried")
+
+        monkeypatch.setattr(collection, "find", fail)
+        second = client.get("/api/properties/02118", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 304
+        assert second.headers["etag"] == first.headers["etag"]
+
+    def test_refresh_changes_etag(self, client):
+        """Test that the refresh endpoint picks up new listings"""
+        client, collection = client
+        before = client.get("/api/properties/02118")
+        collection.insert_one({"id": "prop-0003", "zipCode": "02118", "listPrice": 500000})
+
+        assert client.get("/api/properties/02118").headers["etag"] == before.headers["etag"]
+        assert client.post("/api/properties/02118/refresh").status_code == 200
+
+        after = client.get("/api/properties/02118")
+        assert after.headers["etag"] != before.headers["etag"]
+        assert len(after.json()) == 3
+
+    def test_not_modified_repeats_the_negotiated_validator(self, client):
+        """Test that a 304 carries the coded ETag and Vary of the matching 200"""
+        client, collection = client
+        collection.insert_many(
+            [{"id": f"prop-1{i:03d}", "zipCode": "02118", "listPrice": 500000 + i} for i in range(40)]
+        )
+        gzipped = client.get("/api/properties/02118", headers={"Accept-Encoding": "gzip"})
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert gzipped.headers["etag"].endswith('-gzip"')
+
+        revalidated = client.get(
+            "/api/properties/02118",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == gzipped.headers["etag"]
+        assert revalidated.headers["vary"] == "Accept-Encoding"
+
+        plain = client.get("/api/properties/02118", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["vary"] == "Accept-Encoding"
+        revalidated = client.get(
+            "/api/properties/02118",
+            headers={"Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]},
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == plain.headers["etag"]
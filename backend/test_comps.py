@@ -0,0 +1,202 @@
+import random
+import statistics
+
+import pytest
+from fastapi.testclient import TestClient
+
+from . import logic, main
+from .comps import CompsIndex, CompsQuery, CompsQueryError, _Scorer
+from .models import GlobalAssumptions, MapProperty
+
+
+@pytest.fixture(scope="module")
+def listings(sample_rows):
+    return [MapProperty.model_validate(row) for row in sample_rows]
+
+
+@pytest.fixture(scope="module")
+def index(listings):
+    comps = CompsIndex()
+    comps.load(listings)
+    return comps
+
+
+def _held_out(listing):
+    return CompsQuery(
+        lat=listing.lat,
+        lng=listing.lng,
+        listPrice=listing.listPrice,
+        sqft=listing.sqft,
+        bedrooms=listing.bedrooms,
+        propertyType=listing.propertyType,
+        excludeId=listing.id,
+    )
+
+
+class TestCompsIndex:
+    """Test suite for nearest-comparable rent estimates"""
+
+    def test_held_out_accuracy_and_interval(self, index, listings):
+        """Test that estimates for held-out listings are close and intervals cover"""
+        estimates = index.estimate_many([_held_out(listing) for listing in listings])
+        errors = [
+            abs(estimate.estimatedRent - listing.estimatedRent) / listing.estimatedRent
+            for estimate, listing in zip(estimates, listings)
+        ]
+        coverage = sum(
+            estimate.low <= listing.estimatedRent <= estimate.high
+            for estimate, listing in zip(estimates, listings)
+        ) / len(listings)
+
+        assert statistics.median(errors) < 0.2
+        assert coverage > 0.85
+        assert all(listing.id not in estimate.compIds for estimate, listing in zip(estimates, listings))
+
+    def test_matches_brute_force(self, index, listings):
+        """Test that the grid search returns the exact k nearest comps"""
+        rng = random.Random(3)
+        queries = [_held_out(listing) for listing in rng.sample(listings, 50)]
+        queries += [
+            CompsQuery(lat=listing.lat + rng.uniform(-0.3, 0.3), lng=listing.lng, listPrice=listing.listPrice)
+            for listing in rng.sample(listings, 25)
+        ]
+        queries.append(CompsQuery(lat=45.0, lng=-69.0))
+
+        for query in queries:
+            scorer = _Scorer(query)
+            expected = sorted(
+                (scorer.distance_squared(comp), comp.id)
+                for comp in index._comps.values()
+                if comp.id != query.excludeId
+            )[:8]
+            assert [comp.id for _, comp in index._nearest(query, 8)] == [comp_id for _, comp_id in expected]
+
+    def test_incremental_updates(self, listings):
+        """Test that upserts and removals keep the index current"""
+        comps = CompsIndex()
+        comps.load(listings[:50])
+        target = listings[0]
+        query = CompsQuery(lat=target.lat, lng=target.lng, listPrice=target.listPrice)
+        assert target.id in comps.estimate(query).compIds
+
+        comps.remove(target.id)
+        assert target.id not in comps.estimate(query).compIds
+
+        comps.upsert(target.model_copy(update={"estimatedRent": 99999}))
+        assert comps.estimate(query).high > 10000
+
+        comps.apply_change({"operationType": "delete", "documentKey": {"_id": "x"}})
+        assert comps.loaded
+
+    def test_too_few_comps(self, listings):
+        """Test that no estimate is made from fewer than three comps"""
+        comps = CompsIndex()
+        comps.load(listings[:2])
+        assert comps.estimate(CompsQuery(lat=listings[0].lat, lng=listings[0].lng)) is None
+
+    def test_k_bounds(self, index, listings):
+        """Test that k is validated"""
+        with pytest.raises(CompsQueryError):
+            index.estimate(_held_out(listings[0]), k=500)
+
+
+class TestRentDefault:
+    """Test suite for filling blank rents during analysis"""
+
+    def test_blank_rent_filled_from_listing_comps(self, index, listings, monkeypatch):
+        """Test that a deal built from a listing gets a comps rent when rent is blank"""
+        monkeypatch.setattr(logic, "_rent_provider", index.estimate_property_rent)
+        listing = listings[10]
+        deal = logic.listing_to_property_input(listing, GlobalAssumptions()).model_copy(
+            update={"estimatedRent": 0}
+        )
+
+        result = logic.analyze_property(deal, GlobalAssumptions(), listing.zipCode)
+        expected = index.estimate(_held_out(listing.model_copy(update={"listPrice": deal.listPrice})))
+
+        assert result.property.estimatedRent == expected.estimatedRent
+        assert result.rentEstimate == expected
+        assert result.rentEstimate.low <= result.rentEstimate.estimatedRent <= result.rentEstimate.high
+        assert result.metrics.monthlyNOI != 0
+
+    def test_entered_rent_is_kept(self, index, listings, monkeypatch):
+        """Test that a hand-entered rent is never replaced"""
+        monkeypatch.setattr(logic, "_rent_provider", index.estimate_property_rent)
+        deal = logic.listing_to_property_input(listings[10], GlobalAssumptions()).model_copy(
+            update={"estimatedRent": 1234}
+        )
+        result = logic.analyze_property(deal, GlobalAssumptions(), deal.zipCode)
+        assert result.property.estimatedRent == 1234
+        assert result.rentEstimate is None
+
+    def test_stored_listings_ignore_providers(self, index, listings, monkeypatch):
+        """Test that listing scores do not depend on which providers are registered"""
+        listing = listings[10].model_copy(
+            update={"estimatedRent": 0, "propertyTaxPerYear": 0, "insurancePerYear": 0}
+        )
+        cold = logic.analyze_listing(listing, GlobalAssumptions())
+
+        monkeypatch.setattr(logic, "_rent_provider", index.estimate_property_rent)
+        monkeypatch.setattr(logic, "_zip_defaults_provider", lambda zip_code: logic.ZipDefaults(1, 1, 1))
+        warm = logic.analyze_listing(listing, GlobalAssumptions())
+
+        assert warm == cold
+        assert warm.rentEstimate is None
+        assert warm.property.propertyTaxPerYear > 0
+
+    def test_only_warm_workers_fill_rents(self, listings_collection, sample_rows, listings, monkeypatch):
+        """Test that blank rents do not depend on which endpoints a worker has served"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "comps", CompsIndex())
+        client = TestClient(main.app)
+        deal = logic.listing_to_property_input(listings[10], GlobalAssumptions()).model_copy(
+            update={"estimatedRent": 0}
+        )
+
+        client.post("/api/rent-estimates", json={"subjects": [{"zipCode": deal.zipCode}]})
+        assert logic.analyze_property(deal, GlobalAssumptions(), deal.zipCode).rentEstimate is None
+
+        monkeypatch.setenv("COMPS_WARM", "1")
+        with client:
+            client.post("/api/properties/refresh")
+            result = logic.analyze_property(deal, GlobalAssumptions(), deal.zipCode)
+        assert result.rentEstimate is not None
+        assert result.property.estimatedRent == result.rentEstimate.estimatedRent
+
+
+class TestRentEstimatesEndpoint:
+    """Test suite for /api/rent-estimates"""
+
+    def test_batch(self, listings_collection, sample_rows, monkeypatch):
+        """Test that a batch returns one estimate per subject"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "comps", CompsIndex())
+        first = sample_rows[0]
+        response = TestClient(main.app).post(
+            "/api/rent-estimates",
+            json={
+                "subjects": [
+                    {"lat": first["lat"], "lng": first["lng"], "sqft": first["sqft"], "bedrooms": 3},
+                    {"zipCode": first["zipCode"], "listPrice": first["listPrice"]},
+                    {"zipCode": "99999"},
+                ],
+                "k": 5,
+            },
+        )
+
+        assert response.status_code == 200
+        estimates = response.json()["estimates"]
+        assert len(estimates[0]["compIds"]) == 5
+        assert estimates[1]["low"] <= estimates[1]["estimatedRent"] <= estimates[1]["high"]
+        assert estimates[2] is None
+
+    def test_bad_k(self, listings_collection, monkeypatch):
+        """Test that out-of-range k is rejected"""
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "comps", CompsIndex())
+        response = TestClient(main.app).post(
+            "/api/rent-estimates", json={"subjects": [{"zipCode": "02118"}], "k": 1}
+        )
+        assert response.status_code == 400
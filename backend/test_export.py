@@ -0,0 +1,104 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from . import logic, main
+from .export import score_listings, score_properties, stream_export
+from .logic import analyze_listing, listing_to_property_input
+from .models import GlobalAssumptions, MapProperty, RentEstimate
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _read(fmt, data):
+    if fmt == "arrow":
+        return pa.ipc.open_stream(data).read_all()
+    return pq.read_table(io.BytesIO(data))
+
+
+class TestExport:
+    """Test suite for Arrow/Parquet export of scored deals"""
+
+    @pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+    def test_round_trip_in_batches(self, listings_collection, sample_rows, fmt):
+        """Test that exports stream per batch and load back losslessly"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        chunks = list(stream_export(score_listings(listings_collection), fmt, batch_size=500))
+        table = _read(fmt, b"".join(chunks))
+
+        assert len(chunks) > 2
+        assert table.num_rows == len(sample_rows)
+
+        first = table.slice(0, 1).to_pylist()[0]
+        expected = analyze_listing(MapProperty.model_validate(sample_rows[0]), GlobalAssumptions())
+        assert first["overallScore"] == expected.overallScore
+        assert first["monthlyNOI"] == expected.metrics.monthlyNOI
+        assert len(first["timeline"]) == 5
+
+    def test_filled_rents_are_marked(self, listings_collection, sample_rows, monkeypatch):
+        """Test that rows carry the rentEstimate behind a filled rent and null otherwise"""
+        estimate = RentEstimate(estimatedRent=2100, low=1800, high=2400, compIds=["prop-1", "prop-2"])
+        monkeypatch.setattr(logic, "_rent_provider", lambda prop, zip_code: estimate)
+        listing = MapProperty.model_validate(sample_rows[0])
+        entered = listing_to_property_input(listing, GlobalAssumptions())
+        blank = entered.model_copy(update={"id": "blank", "estimatedRent": 0})
+
+        results = score_properties([entered, blank], GlobalAssumptions(), listing.zipCode)
+        rows = _read("arrow", b"".join(stream_export(results, "arrow"))).to_pylist()
+
+        assert rows[0]["rentEstimate"] is None
+        assert rows[1]["rentEstimate"] == estimate.model_dump()
+        assert rows[1]["estimatedRent"] == 2100
+
+    def test_zip_filter(self, listings_collection, sample_rows):
+        """Test that exports can be limited to one ZIP"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        zip_code = sample_rows[0]["zipCode"]
+        table = _read("arrow", b"".join(stream_export(score_listings(listings_collection, zip_code=zip_code), "arrow")))
+        assert set(table.column("zipCode").to_pylist()) == {zip_code}
+
+
+class TestExportEndpoints:
+    """Test suite for /api/export"""
+
+    def test_export_analysis_has_no_property_cap(self, sample_rows):
+        """Test that property sets beyond the 5-property UI limit export"""
+        properties = [
+            {
+                "id": row["id"],
+                "nickname": row["address"],
+                "address": row["address"],
+                "zipCode": row["zipCode"],
+                "listPrice": row["listPrice"],
+                "estimatedRent": row["estimatedRent"],
+                "propertyTaxPerYear": row["propertyTaxPerYear"],
+                "insurancePerYear": row["insurancePerYear"],
+                "hoaPerYear": row["hoaPerYear"],
+                "maintenancePerMonth": 0,
+                "utilitiesPerMonth": 0,
+                "vacancyRatePercent": 0,
+                "downPaymentPercent": 25,
+                "interestRatePercent": 6.5,
+                "loanTermYears": 30,
+                "closingCosts": 10000,
+                "renovationBudget": 0,
+                "arv": 0,
+            }
+            for row in sample_rows[:20]
+        ]
+        client = TestClient(main.app)
+        response = client.post(
+            "/api/export?format=parquet",
+            json={"zipCode": "02118", "globalAssumptions": {}, "properties": properties},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        assert _read("parquet", response.content).num_rows == 20
+
+    def test_unknown_format(self):
+        """Test that unsupported formats are rejected"""
+        response = TestClient(main.app).get("/api/export/listings?format=csv")
+        assert response.status_code == 400
@@ -0,0 +1,18 @@
+from .importtime import loaded_lazy_modules, measure
+
+
+class TestImportTime:
+    """Guards against heavy optional stacks creeping back into API startup"""
+
+    def test_main_does_not_import_agent_stack(self):
+        """Test that importing the API skips uagents and friends"""
+        timings = measure("backend.main")
+
+        assert any(t.module == "backend.main" for t in timings)
+        assert loaded_lazy_modules(timings) == []
+
+    def test_agent_client_loads_on_first_access(self):
+        """Test that the lazy agent package still exposes the client"""
+        from . import agent
+
+        assert agent.AgentverseClient.__name__ == "AgentverseClient"
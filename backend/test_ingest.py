@@ -0,0 +1,126 @@
+import io
+import json
+import urllib.error
+
+import pytest
+
+from . import ingest
+from .ingest import ingest_file, ingest_listings, iter_csv_rows, iter_json_array
+
+
+class TestIngest:
+    """Test suite for the bulk listings ingestion pipeline"""
+
+    def test_json_array_is_streamed_across_chunks(self, monkeypatch):
+        """Test that objects split across read chunks are reassembled"""
+        monkeypatch.setattr(ingest, "_READ_CHUNK", 7)
+        rows = [{"id": f"prop-{i}", "nested": {"a": [1, 2]}} for i in range(25)]
+        assert list(iter_json_array(io.StringIO(json.dumps(rows, indent=2)))) == rows
+
+    def test_truncated_json_array_raises(self):
+        """Test that a truncated file is reported instead of silently accepted"""
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO('[{"id": "prop-1"}, {"id"')))
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            '[{"a": 1}{"b": 2}]',
+            '[{"a": 1},]',
+            '[,{"a": 1}]',
+            '[{"a": 1}] trailing',
+            '[{"a": 1}][]',
+        ],
+    )
+    def test_malformed_json_array_raises(self, monkeypatch, text):
+        """Test that missing or trailing commas and trailing data are rejected"""
+        monkeypatch.setattr(ingest, "_READ_CHUNK", 3)
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO(text)))
+
+    def test_numbers_split_across_chunks(self, monkeypatch):
+        """Test that a number cut by a chunk boundary is read whole"""
+        monkeypatch.setattr(ingest, "_READ_CHUNK", 2)
+        assert list(iter_json_array(io.StringIO("[1234, 56]  "))) == [1234, 56]
+        assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+    def test_utf8_bom_is_accepted(self, tmp_path, listings_collection, sample_rows):
+        """Test that files saved with a UTF-8 byte order mark still load"""
+        path = tmp_path / "listings.json"
+        path.write_text(json.dumps(sample_rows[:3]), encoding="utf-8-sig")
+        stats = ingest_file(listings_collection, path)
+        assert (stats.rows, stats.invalid) == (3, 0)
+
+    def test_duplicate_ids_are_reported_before_writing(self, monkeypatch, listings_collection, sample_rows, tmp_path):
+        """Test that existing duplicate ids fail the index build before any upsert"""
+        listings_collection.insert_many([dict(sample_rows[0]), dict(sample_rows[0])])
+        path = tmp_path / "listings.json"
+        path.write_text(json.dumps(sample_rows[1:3]))
+        monkeypatch.setattr(ingest, "get_properties_collection", lambda: listings_collection)
+
+        assert ingest.main([str(path)]) == 1
+        assert listings_collection.count_documents({}) == 2
+
+    def test_csv_blank_cells_use_defaults(self):
+        """Test that empty CSV cells are dropped so model defaults apply"""
+        rows = list(iter_csv_rows(io.StringIO("id,imageUrl\nprop-1,\n")))
+        assert rows == [{"id": "prop-1"}]
+
+    def test_sample_listings_rerun_is_idempotent(self, listings_collection, sample_listings_path):
+        """Test that loading the sample file twice upserts once and modifies nothing"""
+        batches = []
+        first = ingest_file(listings_collection, sample_listings_path, batch_size=100, listeners=[batches.append])
+        second = ingest_file(listings_collection, sample_listings_path, batch_size=100)
+
+        assert first.invalid == 0
+        assert first.upserted == first.rows == listings_collection.count_documents({})
+        assert second.upserted == 0
+        assert second.modified == 0
+        assert sum(len(batch) for batch in batches) == first.rows
+
+    def test_invalid_rows_are_skipped(self, listings_collection, sample_rows):
+        """Test that rows failing MapProperty validation are counted, not written"""
+        good = sample_rows[0]
+        stats = ingest_listings(listings_collection, [good, {**good, "id": "bad", "propertyType": "castle"}])
+
+        assert stats.invalid == 1
+        assert listings_collection.count_documents({}) == 1
+
+    def test_refresh_api_posts_each_touched_zip(self, monkeypatch):
+        """Test that the running API is refreshed once per touched ZIP"""
+        calls = []
+
+        def fake_urlopen(request, timeout):
+            calls.append((request.get_method(), request.full_url))
+            return io.BytesIO(b"{}")
+
+        monkeypatch.setattr(ingest.urllib.request, "urlopen", fake_urlopen)
+        assert ingest.refresh_api("http://api:8000/", {"94110", "10001"})
+        assert calls == [
+            ("POST", "http://api:8000/api/properties/10001/refresh"),
+            ("POST", "http://api:8000/api/properties/94110/refresh"),
+        ]
+
+        calls.clear()
+        many = {f"{zip_code:05d}" for zip_code in range(ingest.REFRESH_ALL_THRESHOLD + 1)}
+        assert ingest.refresh_api("http://api:8000", many)
+        assert calls == [("POST", "http://api:8000/api/properties/refresh")]
+
+    def test_main_refreshes_api_and_rebuilds_snapshot(
+        self, monkeypatch, tmp_path, listings_collection, sample_listings_path
+    ):
+        """Test that the CLI reports a failed refresh and writes the snapshot"""
+        from .snapshot import Snapshot
+
+        def unreachable(request, timeout):
+            raise urllib.error.URLError("connection refused")
+
+        monkeypatch.setattr(ingest, "get_properties_collection", lambda: listings_collection)
+        monkeypatch.setattr(ingest.urllib.request, "urlopen", unreachable)
+        snapshot_path = tmp_path / "listings.snap"
+        code = ingest.main(
+            [str(sample_listings_path), "--refresh-url", "http://api:8000", "--snapshot", str(snapshot_path)]
+        )
+
+        assert code == 1
+        assert Snapshot(snapshot_path).rows == listings_collection.count_documents({})
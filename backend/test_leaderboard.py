@@ -0,0 +1,112 @@
+
+import pytest
+from fastapi.testclient import TestClient
+
+from . import main
+from .ingest import ingest_listings
+from .leaderboard import Leaderboard, LeaderboardQueryError, parse_region
+from .logic import analyze_listing
+from .models import GlobalAssumptions, MapProperty
+
+
+@pytest.fixture
+def loaded(listings_collection, sample_rows):
+    listings_collection.insert_many([dict(row) for row in sample_rows])
+    board = Leaderboard()
+    board.ensure_loaded(listings_collection)
+    return board
+
+
+def _brute_force(rows, prefix, property_type, max_price, limit):
+    scored = []
+    for row in rows:
+        if not row["zipCode"].startswith(prefix) or row["propertyType"] != property_type:
+            continue
+        if row["listPrice"] > max_price:
+            continue
+        result = analyze_listing(MapProperty.model_validate(row), GlobalAssumptions())
+        scored.append((-result.overallScore, row["id"]))
+    return [listing_id for _, listing_id in sorted(scored)[:limit]]
+
+
+class TestLeaderboard:
+    """Test suite for the incrementally maintained best-deals leaderboard"""
+
+    def test_filtered_top_k_matches_full_scan(self, loaded, sample_rows):
+        """Test that a region/type/price query equals scoring everything"""
+        top = loaded.top(region="021", property_type="multi-family", max_price=900000, limit=50)
+        expected = _brute_force(sample_rows, "021", "multi-family", 900000, 50)
+        assert [entry.id for entry in top] == expected
+
+    @pytest.mark.parametrize("max_price", [150000, 412345, 2000000])
+    def test_price_cap_across_bands(self, loaded, sample_rows, max_price):
+        """Test that caps inside and between price bands match scoring everything"""
+        top = loaded.top(region="021", property_type="multi-family", max_price=max_price, limit=20)
+        expected = _brute_force(sample_rows, "021", "multi-family", max_price, 20)
+        assert [entry.id for entry in top] == expected
+
+    def test_score_change_reorders(self, loaded, sample_rows, listings_collection):
+        """Test that an ingested update moves a listing to the top"""
+        row = sample_rows[-1]
+        better = {**row, "estimatedRent": row["listPrice"] / 10}
+        ingest_listings(listings_collection, [better], listeners=[loaded.on_batch])
+
+        assert loaded.top(limit=1)[0].id == row["id"]
+        assert loaded.top(region=row["zipCode"], limit=1)[0].id == row["id"]
+
+    def test_remove_drops_from_every_board(self, loaded, sample_rows):
+        """Test that removed listings disappear from all boards"""
+        best = loaded.top(limit=1)[0]
+        loaded.remove(best.id)
+        assert best.id not in {entry.id for entry in loaded.top(limit=500)}
+        assert best.id not in {entry.id for entry in loaded.top(region=best.zipCode, limit=500)}
+
+    @pytest.mark.parametrize("region, expected", [(None, "*"), ("021xx", "021"), ("02118", "02118")])
+    def test_parse_region(self, region, expected):
+        """Test that regions accept prefixes and full ZIPs"""
+        assert parse_region(region) == expected
+
+    def test_invalid_query(self, loaded):
+        """Test that unknown metrics and property types are rejected"""
+        with pytest.raises(LeaderboardQueryError):
+            loaded.top(metric="vibes")
+        with pytest.raises(LeaderboardQueryError):
+            loaded.top(property_type="castle")
+
+
+class TestLeaderboardEndpoint:
+    """Test suite for /api/leaderboard"""
+
+    def test_top_multi_family_in_prefix(self, listings_collection, sample_rows, monkeypatch):
+        """Test the documented query shape"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "leaderboard", Leaderboard())
+        client = TestClient(main.app)
+
+        response = client.get(
+            "/api/leaderboard?region=021xx&propertyType=multi-family&maxPrice=900000&limit=50"
+        )
+        results = response.json()["results"]
+
+        assert response.status_code == 200
+        assert all(item["zipCode"].startswith("021") for item in results)
+        assert all(item["listPrice"] <= 900000 for item in results)
+        assert client.get("/api/leaderboard?region=1").status_code == 400
+
+    def test_zip_refresh_keeps_other_zips(self, listings_collection, sample_rows, monkeypatch):
+        """Test that a ZIP refresh re-reads that ZIP without unloading the board"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        board = Leaderboard()
+        board.ensure_loaded(listings_collection)
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "leaderboard", board)
+        client = TestClient(main.app)
+
+        row = sample_rows[-1]
+        listings_collection.update_one({"id": row["id"]}, {"$set": {"estimatedRent": row["listPrice"] / 10}})
+        assert client.post(f"/api/properties/{row['zipCode']}/refresh").status_code == 200
+
+        assert board.loaded
+        assert board.top(limit=1)[0].id == row["id"]
+        assert len(board.top(limit=500)) == min(500, len(sample_rows))
@@ -0,0 +1,223 @@
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from . import main
+from .cache import ZipResponseCache
+from .listings import (
+    ListingIndex,
+    ListingQuery,
+    ListingQueryError,
+    fetch_page,
+    iter_listings,
+    iter_valid_listings,
+    parse_fields,
+)
+from .models import MapProperty
+
+
+@pytest.fixture
+def collection(listings_collection):
+    listings_collection.insert_many(
+        [
+            {"id": f"prop-{i:04d}", "zipCode": "02118", "listPrice": price, "lat": 42.3, "lng": -71.0}
+            for i, price in enumerate([900000, 500000, 700000, 500000, 650000])
+        ]
+        + [{"id": "prop-0099", "zipCode": "02134", "listPrice": 1}]
+    )
+    return listings_collection
+
+
+class TestListingPagination:
+    """Test suite for keyset pagination over listings"""
+
+    def _walk(self, collection, **kwargs):
+        pages, cursor = [], None
+        while True:
+            items, cursor = fetch_page(collection, ListingQuery(zip_code="02118", cursor=cursor, **kwargs))
+            pages.append(items)
+            if cursor is None:
+                return pages
+
+    def test_pages_by_id_cover_zip_once(self, collection):
+        """Test that walking _id pages yields every listing exactly once"""
+        pages = self._walk(collection, limit=2)
+        ids = [item["id"] for page in pages for item in page]
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert sorted(ids) == [f"prop-{i:04d}" for i in range(5)]
+
+    def test_pages_by_price_break_ties_on_id(self, collection):
+        """Test that equal prices straddling a page boundary are not lost"""
+        pages = self._walk(collection, limit=1, sort="listPrice")
+        prices = [item["listPrice"] for page in pages for item in page]
+        assert prices == [500000, 500000, 650000, 700000, 900000]
+
+    def test_projection_keeps_only_requested_fields(self, collection):
+        """Test that fields= trims documents but still yields a cursor"""
+        items, cursor = fetch_page(
+            collection, ListingQuery(zip_code="02118", limit=2, fields=parse_fields("lat,lng"))
+        )
+        assert items == [{"lat": 42.3, "lng": -71.0}] * 2
+        assert cursor is not None
+
+    def test_unknown_field_rejected(self):
+        """Test that projections are restricted to listing fields"""
+        with pytest.raises(ListingQueryError):
+            parse_fields("lat,password")
+
+    def test_cursor_for_other_sort_rejected(self, collection):
+        """Test that a cursor cannot be replayed under another sort"""
+        _, cursor = fetch_page(collection, ListingQuery(zip_code="02118", limit=1))
+        with pytest.raises(ListingQueryError):
+            fetch_page(collection, ListingQuery(zip_code="02118", sort="listPrice", cursor=cursor))
+
+    def test_iter_listings_streams_whole_zip(self, collection):
+        """Test that streaming without a limit returns every listing"""
+        assert len(list(iter_listings(collection, ListingQuery(zip_code="02118")))) == 5
+
+
+class _PriceIndex(ListingIndex):
+    def __init__(self):
+        super().__init__()
+        self.prices = {}
+
+    def _add(self, listing):
+        self.prices[listing.id] = listing.listPrice
+
+    def _discard(self, listing_id):
+        self.prices.pop(listing_id, None)
+
+    def _clear(self):
+        self.prices.clear()
+
+
+class TestListingIndex:
+    """Test suite for the shared base of in-memory listing indexes"""
+
+    @pytest.fixture
+    def stored(self, listings_collection, sample_rows):
+        listings_collection.insert_many([dict(row) for row in sample_rows[:20]])
+        listings_collection.insert_one({"id": "broken", "zipCode": "02118"})
+        return listings_collection
+
+    def test_iter_valid_listings_skips_invalid(self, stored):
+        """Test that documents failing validation are skipped"""
+        listings = list(iter_valid_listings(stored))
+        assert len(listings) == 20
+        assert all(isinstance(listing, MapProperty) for listing in listings)
+
+    def test_incomplete_subclass_fails_at_construction(self):
+        """Test that an index missing a maintenance hook cannot be created"""
+
+        class Incomplete(ListingIndex):
+            def _add(self, listing):
+                pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_delete_by_document_id_stays_loaded(self, stored):
+        """Test that change-stream deletes drop one listing instead of unloading"""
+        index = _PriceIndex()
+        index.ensure_loaded(stored)
+        document = stored.find_one({"id": {"$ne": "broken"}})
+        stored.delete_one({"_id": document["_id"]})
+
+        index.apply_change({"operationType": "delete", "documentKey": {"_id": document["_id"]}})
+
+        assert index.loaded
+        assert document["id"] not in index.prices
+        assert len(index.prices) == 19
+
+    def test_refresh_zip_rereads_only_that_zip(self, stored, sample_rows):
+        """Test that a ZIP refresh picks up that ZIP's changes and leaves the rest"""
+        index = _PriceIndex()
+        index.ensure_loaded(stored)
+        first = sample_rows[0]
+        other = next(row for row in sample_rows[:20] if row["zipCode"] != first["zipCode"])
+        stored.update_one({"id": first["id"]}, {"$set": {"listPrice": 1}})
+        stored.update_one({"id": other["id"]}, {"$set": {"listPrice": 1}})
+
+        index.refresh(stored, first["zipCode"])
+
+        assert index.prices[first["id"]] == 1
+        assert index.prices[other["id"]] == other["listPrice"]
+
+    def test_concurrent_first_use_loads_once(self, stored, monkeypatch):
+        """Test that concurrent callers wait for a single load"""
+        scans = []
+        started = threading.Event()
+        release = threading.Event()
+        original = type(stored).find
+
+        def slow_find(self, *args, **kwargs):
+            scans.append(args)
+            started.set()
+            release.wait(5)
+            return original(self, *args, **kwargs)
+
+        monkeypatch.setattr(type(stored), "find", slow_find)
+        index = _PriceIndex()
+        threads = [threading.Thread(target=index.ensure_loaded, args=(stored,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(scans) == 1
+        assert len(index.prices) == 20
+
+    def test_changes_during_load_are_replayed(self, stored, sample_rows, monkeypatch):
+        """Test that a change seen while reading Mongo is not lost"""
+        index = _PriceIndex()
+        original = type(stored).find
+        row = sample_rows[0]
+
+        def find_then_change(self, *args, **kwargs):
+            cursor = original(self, *args, **kwargs)
+            index.upsert(MapProperty.model_validate({**row, "listPrice": 2}))
+            return cursor
+
+        monkeypatch.setattr(type(stored), "find", find_then_change)
+        index.ensure_loaded(stored)
+
+        assert index.prices[row["id"]] == 2
+
+
+class TestGetPropertiesQuery:
+    """Test suite for paginated and streamed /api/properties/{zip_code}"""
+
+    @pytest.fixture
+    def client(self, collection, monkeypatch):
+        monkeypatch.setattr(main, "mongo", collection)
+        monkeypatch.setattr(main, "listings_cache", ZipResponseCache())
+        return TestClient(main.app)
+
+    def test_paginated_envelope(self, client):
+        """Test that pagination parameters switch to the items envelope"""
+        body = client.get("/api/properties/02118?limit=3&fields=listPrice").json()
+        assert len(body["items"]) == 3
+        assert body["nextCursor"]
+
+    def test_empty_zip_returns_list(self, client):
+        """Test that an empty ZIP keeps the array response type"""
+        assert client.get("/api/properties/99999").json() == []
+
+    def test_stream_ndjson(self, client):
+        """Test that stream=true returns one listing per line"""
+        response = client.get("/api/properties/02118?stream=true&fields=id")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert len(lines) == 5
+
+    def test_invalid_limit(self, client):
+        """Test that out-of-range limits are rejected"""
+        response = client.get("/api/properties/02118?limit=0")
+        assert response.status_code == 400
+        assert "error" in response.json()
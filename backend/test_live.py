@@ -0,0 +1,152 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from starlette.websockets import WebSocketDisconnect
+
+from . import main
+from .live import LivePatchError, LiveSession
+from .logic import analyze_property
+from .models import AnalyzePropertiesRequest
+
+
+def _property(prop_id, rent):
+    return {
+        "id": prop_id,
+        "nickname": f"Property {prop_id}",
+        "address": "123 Main St",
+        "zipCode": "02134",
+        "listPrice": 500000,
+        "estimatedRent": rent,
+        "propertyTaxPerYear": 5000,
+        "insurancePerYear": 1200,
+        "hoaPerYear": 0,
+        "maintenancePerMonth": 200,
+        "utilitiesPerMonth": 150,
+        "vacancyRatePercent": 5,
+        "downPaymentPercent": 20,
+        "interestRatePercent": 6.5,
+        "loanTermYears": 30,
+        "closingCosts": 15000,
+        "renovationBudget": 0,
+        "arv": 500000,
+    }
+
+
+@pytest.fixture
+def init_message():
+    return {
+        "type": "init",
+        "zipCode": "02134",
+        "globalAssumptions": {},
+        "properties": [_property("a", 3000), _property("b", 3500)],
+    }
+
+
+class TestLiveSession:
+    """Test suite for server-side live scoring sessions"""
+
+    def test_appreciation_patch_reports_only_changed_fields(self, init_message):
+        """Test that an appreciation edit leaves monthly metrics out of the update"""
+        session = LiveSession(AnalyzePropertiesRequest.model_validate(init_message))
+        session.apply_patch({"assumptions": {"defaultAppreciationRatePercent": 8}})
+        update = session.flush()
+
+        metrics = update["changed"]["a"]["metrics"]
+        assert "fiveYearTotalRoiPercent" in metrics
+        assert "monthlyNOI" not in metrics
+        assert "property" not in update["changed"]["a"]
+
+    def test_property_patch_reranks(self, init_message):
+        """Test that editing one property re-scores it and reorders the ranking"""
+        session = LiveSession(AnalyzePropertiesRequest.model_validate(init_message))
+        assert session.ranking == ["b", "a"]
+
+        session.apply_patch({"properties": {"a": {"estimatedRent": 4500}}})
+        update = session.flush()
+
+        assert set(update["changed"]) == {"a"}
+        assert update["ranking"] == ["a", "b"]
+        assert session.results["a"] == analyze_property(
+            session.properties["a"], session.assumptions, "02134"
+        )
+
+    def test_rejected_patch_leaves_session_untouched(self, init_message):
+        """Test that an invalid patch is all-or-nothing"""
+        session = LiveSession(AnalyzePropertiesRequest.model_validate(init_message))
+        with pytest.raises(LivePatchError):
+            session.apply_patch({"properties": {"a": {"estimatedRent": 1}}, "remove": ["b"]})
+        assert not session.has_pending
+        assert set(session.properties) == {"a", "b"}
+
+    @pytest.mark.parametrize(
+        "patch",
+        [{"remove": 5}, {"remove": [["x"]]}, {"properties": {"a": [1]}}, {"add": ["a"]}],
+    )
+    def test_malformed_patch_is_rejected(self, init_message, patch):
+        """Test that wrongly shaped patches raise a validation error"""
+        session = LiveSession(AnalyzePropertiesRequest.model_validate(init_message))
+        with pytest.raises(ValidationError):
+            session.apply_patch(patch)
+        assert not session.has_pending
+
+    def test_duplicate_ids_are_rejected(self, init_message):
+        """Test that init and add refuse ids already in the session"""
+        init_message["properties"].append(_property("a", 2000))
+        with pytest.raises(LivePatchError):
+            LiveSession(AnalyzePropertiesRequest.model_validate(init_message))
+
+        init_message["properties"].pop()
+        session = LiveSession(AnalyzePropertiesRequest.model_validate(init_message))
+        with pytest.raises(LivePatchError):
+            session.apply_patch({"add": [_property("b", 2000)]})
+        assert session.properties["b"].estimatedRent == 3500
+
+
+class TestUnderwriteWebSocket:
+    """Test suite for the /ws/underwrite endpoint"""
+
+    def test_burst_of_patches_is_coalesced(self, init_message):
+        """Test that rapid edits produce one update with the final values"""
+        client = TestClient(main.app)
+        with client.websocket_connect("/ws/underwrite") as ws:
+            ws.send_text(json.dumps(init_message))
+            assert ws.receive_json()["type"] == "snapshot"
+
+            for rent in (3100, 3200, 3300):
+                ws.send_text(json.dumps({"type": "patch", "properties": {"a": {"estimatedRent": rent}}}))
+            update = ws.receive_json()
+
+            assert update["type"] == "update"
+            assert update["changed"]["a"]["property"] == {"estimatedRent": 3300}
+
+    def test_patch_before_init_is_an_error(self):
+        """Test that patches require an initialized session"""
+        client = TestClient(main.app)
+        with client.websocket_connect("/ws/underwrite") as ws:
+            ws.send_text(json.dumps({"type": "patch"}))
+            assert ws.receive_json()["type"] == "error"
+
+    def test_malformed_patch_keeps_session_open(self, init_message):
+        """Test that a badly typed patch is answered with an error, not a disconnect"""
+        client = TestClient(main.app)
+        with client.websocket_connect("/ws/underwrite") as ws:
+            ws.send_text(json.dumps(init_message))
+            assert ws.receive_json()["type"] == "snapshot"
+
+            ws.send_text(json.dumps({"type": "patch", "remove": 5}))
+            assert ws.receive_json()["type"] == "error"
+            ws.send_text(json.dumps({"type": "patch", "properties": {"a": {"estimatedRent": 4500}}}))
+            assert ws.receive_json()["type"] == "update"
+
+    def test_binary_frame_ends_session(self, init_message):
+        """Test that a binary frame closes the session instead of hanging it"""
+        client = TestClient(main.app)
+        with client.websocket_connect("/ws/underwrite") as ws:
+            ws.send_text(json.dumps(init_message))
+            assert ws.receive_json()["type"] == "snapshot"
+
+            ws.send_bytes(b"\x00")
+            with pytest.raises(WebSocketDisconnect):
+                ws.receive_text()
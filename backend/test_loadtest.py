@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from . import main
+from .loadtest import (
+    LatencyHistogram,
+    LevelResult,
+    WorkloadGenerator,
+    format_report,
+    local_stand_ins,
+    parse_mix,
+    run,
+)
+
+
+class TestLatencyHistogram:
+    """Test suite for latency percentiles and buckets"""
+
+    def test_percentiles(self):
+        """Test nearest-rank percentiles"""
+        histogram = LatencyHistogram()
+        for value in range(1, 101):
+            histogram.record(float(value))
+        summary = histogram.summary()
+        assert (summary["p50"], summary["p99"], summary["max"]) == (50.0, 99.0, 100.0)
+
+    def test_buckets(self):
+        """Test that samples land in the first bucket that bounds them"""
+        histogram = LatencyHistogram()
+        for value in (0.5, 1.5, 7000):
+            histogram.record(value)
+        buckets = dict(histogram.buckets())
+        assert (buckets["<=1ms"], buckets["<=2ms"], buckets[">5000ms"]) == (1, 1, 1)
+
+    def test_shed_requests_are_not_latency_samples(self):
+        """Test that shed responses count as outcomes, not latencies"""
+        level = LevelResult(concurrency=1, duration=1.0)
+        level.record("analyze", 200, 5.0)
+        level.record("analyze", 503, 0.1)
+        assert level.latencies["analyze"].samples == [5.0]
+        assert level.outcomes() == {"ok": 1, "shed": 1}
+        assert level.throughput == 1.0
+
+
+class TestWorkloadGenerator:
+    """Test suite for synthesized request payloads"""
+
+    def test_mix_and_payloads(self, sample_rows):
+        """Test that requests follow the mix and carry valid comparisons"""
+        generator = WorkloadGenerator(sample_rows, parse_mix("analyze=1,properties=1"), seed=7)
+        requests = [generator.next_request() for _ in range(200)]
+
+        assert {endpoint for endpoint, *_ in requests} == {"analyze", "properties"}
+        for endpoint, method, path, body in requests:
+            if endpoint == "analyze":
+                assert (method, path) == ("POST", "/analyze-properties")
+                assert 2 <= len(body["properties"]) <= 5
+                assert {prop["zipCode"] for prop in body["properties"]} == {body["zipCode"]}
+            else:
+                assert method == "GET" and path.startswith("/api/properties/")
+
+    def test_unknown_endpoint(self, sample_rows):
+        """Test that typos in the mix are rejected"""
+        with pytest.raises(ValueError):
+            WorkloadGenerator(sample_rows, {"analyse": 1})
+
+
+class TestLoadRun:
+    """Test suite for driving the in-process app"""
+
+    def test_run_against_stand_ins(self, sample_rows):
+        """Test a short run hits every endpoint and restores the app"""
+        original_mongo = main.mongo
+        generator = WorkloadGenerator(sample_rows, seed=1)
+        with local_stand_ins(sample_rows, agent_latency=0.0) as app:
+            results = asyncio.run(run(generator, [1, 3], 0.3, app=app))
+
+        assert main.mongo is original_mongo
+        assert [level.concurrency for level in results] == [1, 3]
+        for level in results:
+            assert level.outcomes()["error"] == 0
+            assert level.outcomes()["ok"] > 0
+        assert all(sum(results[-1].statuses[name].values()) for name in ("analyze", "properties"))
+        assert "Throughput vs concurrency" in format_report(results)
@@ -0,0 +1,102 @@
+import pytest
+
+from . import logic
+from .logic import ZipDefaults, analyze_property, reanalyze_properties, reanalyze_property
+from .models import GlobalAssumptions, PropertyInput
+
+
+@pytest.fixture
+def property_input():
+    return PropertyInput(
+        id="prop-001",
+        nickname="Boston Triple Decker",
+        address="123 Main St, Boston, MA",
+        zipCode="02118",
+        listPrice=750000,
+        estimatedRent=4500,
+        propertyTaxPerYear=8000,
+        insurancePerYear=1500,
+        hoaPerYear=0,
+        maintenancePerMonth=300,
+        utilitiesPerMonth=200,
+        vacancyRatePercent=5,
+        downPaymentPercent=20,
+        interestRatePercent=6.5,
+        loanTermYears=30,
+        closingCosts=15000,
+        renovationBudget=50000,
+        arv=850000,
+    )
+
+
+class TestReanalyzeProperty:
+    """Test suite for incremental re-analysis on assumption changes"""
+
+    @pytest.mark.parametrize(
+        "update",
+        [
+            {"defaultAppreciationRatePercent": 7.5},
+            {"defaultVacancyRatePercent": 12},
+            {"defaultMaintenancePercent": 4},
+            {"defaultAppreciationRatePercent": 0, "defaultVacancyRatePercent": 9},
+        ],
+    )
+    @pytest.mark.parametrize("blank_fields", [(), ("vacancyRatePercent", "maintenancePerMonth")])
+    def test_matches_full_analysis(self, property_input, update, blank_fields):
+        """Test that incremental results equal a from-scratch analysis"""
+        prop = property_input.model_copy(update={name: 0 for name in blank_fields})
+        before = GlobalAssumptions()
+        after = before.model_copy(update=update)
+        previous = analyze_property(prop, before, "02118")
+
+        incremental = reanalyze_property(prop, previous, before, after, "02118")
+        assert incremental == analyze_property(prop, after, "02118")
+
+    def test_appreciation_keeps_operating_metrics(self, property_input):
+        """Test that an appreciation change leaves the monthly figures alone"""
+        before = GlobalAssumptions()
+        after = before.model_copy(update={"defaultAppreciationRatePercent": 10})
+        previous = analyze_property(property_input, before, "02118")
+
+        result = reanalyze_property(property_input, previous, before, after, "02118")
+
+        assert result.property == previous.property
+        assert result.metrics.monthlyNOI == previous.metrics.monthlyNOI
+        assert result.metrics.fiveYearEquityBuilt > previous.metrics.fiveYearEquityBuilt
+
+    def test_unused_default_returns_previous(self, property_input):
+        """Test that defaults shadowed by explicit values are a no-op"""
+        before = GlobalAssumptions()
+        after = before.model_copy(update={"defaultVacancyRatePercent": 20})
+        previous = analyze_property(property_input, before, "02118")
+
+        assert reanalyze_property(property_input, previous, before, after, "02118") is previous
+
+    @pytest.mark.parametrize("update", [{}, {"defaultAppreciationRatePercent": 7.5}])
+    def test_provider_change_falls_back_to_full_analysis(self, property_input, update, monkeypatch):
+        """Test that defaults from a newly registered provider are not skipped"""
+        prop = property_input.model_copy(update={"propertyTaxPerYear": 0})
+        before = GlobalAssumptions()
+        after = before.model_copy(update=update)
+        previous = analyze_property(prop, before, "02118")
+
+        monkeypatch.setattr(
+            logic,
+            "_zip_defaults_provider",
+            lambda zip_code: ZipDefaults(tax_per_year=20000, insurance_per_year=1500, utilities_per_month=200),
+        )
+        result = reanalyze_property(prop, previous, before, after, "02118")
+
+        assert result == analyze_property(prop, after, "02118")
+        assert result.property.propertyTaxPerYear != previous.property.propertyTaxPerYear
+
+    def test_batch_matches_by_property_id(self, property_input):
+        """Test that batch reanalysis pairs results by id regardless of order"""
+        other = property_input.model_copy(update={"id": "prop-002", "estimatedRent": 5200})
+        before = GlobalAssumptions()
+        after = before.model_copy(update={"defaultAppreciationRatePercent": 5})
+        previous = [analyze_property(p, before, "02118") for p in (other, property_input)]
+
+        results = reanalyze_properties([property_input, other], previous, before, after, "02118")
+        assert [r.property.id for r in results] == ["prop-001", "prop-002"]
+        assert results[1] == analyze_property(other, after, "02118")
@@ -0,0 +1,137 @@
+
+import pytest
+from fastapi.testclient import TestClient
+
+from . import main
+from .cache import ZipResponseCache
+from .ingest import ingest_listings
+from .market import MarketStats
+from .logic import _synthetic_zip_defaults, analyze_property
+from .models import GlobalAssumptions, MapProperty, PropertyInput
+
+
+def _blank_tax_property(zip_code):
+    return PropertyInput(
+        id="subject",
+        nickname="Subject",
+        address="1 Main St",
+        zipCode=zip_code,
+        listPrice=500000,
+        estimatedRent=3000,
+        propertyTaxPerYear=0,
+        insurancePerYear=1200,
+        hoaPerYear=0,
+        maintenancePerMonth=200,
+        utilitiesPerMonth=150,
+        vacancyRatePercent=5,
+        downPaymentPercent=20,
+        interestRatePercent=6.5,
+        loanTermYears=30,
+        closingCosts=15000,
+        renovationBudget=0,
+        arv=500000,
+    )
+
+
+def _busiest_zip(rows):
+    counts = {}
+    for row in rows:
+        counts[row["zipCode"]] = counts.get(row["zipCode"], 0) + 1
+    return max(counts, key=counts.get)
+
+
+class TestMarketStats:
+    """Test suite for incrementally maintained ZIP market aggregates"""
+
+    def test_summary_matches_full_scan(self, listings_collection, sample_rows):
+        """Test that loaded aggregates match the raw listings"""
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        zip_code = _busiest_zip(sample_rows)
+        prices = sorted(row["listPrice"] for row in sample_rows if row["zipCode"] == zip_code)
+
+        stats = MarketStats()
+        stats.ensure_loaded(listings_collection)
+        summary = stats.zip_summary(zip_code)
+
+        assert summary["inventory"] == len(prices)
+        assert summary["listPrice"]["mean"] == round(sum(prices) / len(prices), 2)
+        assert sum(group["inventory"] for group in summary["byPropertyType"].values()) == len(prices)
+
+    def test_ingest_updates_loaded_zip_incrementally(self, listings_collection, sample_rows):
+        """Test that ingestion batches move listings between ZIP aggregates"""
+        first, second = sample_rows[0], sample_rows[1]
+        stats = MarketStats()
+        stats.ensure_loaded(listings_collection)
+
+        ingest_listings(listings_collection, [first], listeners=[stats.on_batch])
+        assert stats.zip_summary(first["zipCode"])["inventory"] == 1
+
+        moved = {**first, "zipCode": second["zipCode"]}
+        ingest_listings(listings_collection, [second, moved], listeners=[stats.on_batch])
+        assert stats.zip_summary(first["zipCode"]) is None
+        assert stats.zip_summary(second["zipCode"])["inventory"] == 2
+
+    def test_unloaded_stats_are_not_partially_tracked(self, sample_rows):
+        """Test that updates before the first load wait for it"""
+        stats = MarketStats()
+        stats.upsert(MapProperty.model_validate(sample_rows[0]))
+        assert stats.zip_summary(sample_rows[0]["zipCode"]) is None
+
+    def test_zip_defaults_use_observed_medians(self, listings_collection, sample_rows):
+        """Test that loaded ZIPs feed median tax into analysis defaults"""
+        row = sample_rows[0]
+        listings_collection.insert_one(dict(row))
+        stats = MarketStats()
+        stats.ensure_loaded(listings_collection)
+
+        assert stats.zip_defaults(row["zipCode"]).tax_per_year == row["propertyTaxPerYear"]
+        assert stats.zip_defaults("99999") is None
+
+
+class TestMarketStatsEndpoint:
+    """Test suite for /api/market-stats/{zip_code}"""
+
+    @pytest.fixture
+    def client(self, listings_collection, sample_rows, monkeypatch):
+        listings_collection.insert_many([dict(row) for row in sample_rows])
+        stats = MarketStats()
+        monkeypatch.setattr(main, "mongo", listings_collection)
+        monkeypatch.setattr(main, "listings_cache", ZipResponseCache())
+        monkeypatch.setattr(main, "market_stats", stats)
+        return TestClient(main.app)
+
+    def test_market_stats(self, client, sample_rows):
+        """Test that stats are served per ZIP"""
+        zip_code = _busiest_zip(sample_rows)
+        body = client.get(f"/api/market-stats/{zip_code}").json()
+
+        assert body["zipCode"] == zip_code
+        assert body["capRatePercent"]["p10"] <= body["capRatePercent"]["p90"]
+
+    def test_unknown_zip_is_404(self, client):
+        """Test that ZIPs without listings report an error"""
+        response = client.get("/api/market-stats/99999")
+        assert response.status_code == 404
+        assert "error" in response.json()
+
+    def test_cold_worker_defaults_ignore_request_history(self, client, sample_rows):
+        """Test that serving stats does not change analysis defaults without warm-up"""
+        zip_code = _busiest_zip(sample_rows)
+        prop = _blank_tax_property(zip_code)
+        before = analyze_property(prop, GlobalAssumptions(), zip_code)
+
+        assert client.get(f"/api/market-stats/{zip_code}").status_code == 200
+        assert analyze_property(prop, GlobalAssumptions(), zip_code) == before
+
+    def test_warm_worker_uses_observed_defaults(self, client, sample_rows, monkeypatch):
+        """Test that MARKET_STATS_WARM loads every ZIP and registers the defaults provider"""
+        monkeypatch.setenv("MARKET_STATS_WARM", "1")
+        zip_code = _busiest_zip(sample_rows)
+        prop = _blank_tax_property(zip_code)
+        synthetic_tax = analyze_property(prop, GlobalAssumptions(), zip_code).property.propertyTaxPerYear
+
+        with client:
+            median = main.market_stats.zip_defaults(zip_code).tax_per_year
+            warm_tax = analyze_property(prop, GlobalAssumptions(), zip_code).property.propertyTaxPerYear
+        assert warm_tax == pytest.approx(synthetic_tax * median / _synthetic_zip_defaults(zip_code).tax_per_year)
+        assert analyze_property(prop, GlobalAssumptions(), zip_code).property.propertyTaxPerYear == synthetic_tax
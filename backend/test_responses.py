@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import pytest
+from bson import ObjectId
+from starlette.requests import Request
+
+from .models import GlobalAssumptions
+from . import responses
+from .responses import COMPRESSION_MIN_BYTES, _pick_encoding, dumps, json_response
+
+
+def _request(accept_encoding: str = "") -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+class TestResponses:
+    """Test suite for the fast JSON response layer"""
+
+    def test_dumps_model_uses_model_core(self):
+        """Test that pydantic models are dumped without re-validation"""
+        assumptions = GlobalAssumptions()
+        assert json.loads(dumps(assumptions)) == assumptions.model_dump()
+
+    def test_dumps_handles_object_id(self):
+        """Test that Mongo ObjectIds serialize as strings"""
+        oid = ObjectId()
+        assert json.loads(dumps([{"_id": oid}])) == [{"_id": str(oid)}]
+
+    def test_dumps_rejects_unknown_types(self):
+        """Test that unsupported types still fail loudly"""
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+    def test_small_payload_is_not_compressed(self):
+        """Test that tiny bodies skip compression"""
+        response = json_response(_request("gzip"), {"ok": True})
+        assert "content-encoding" not in response.headers
+
+    def test_large_payload_is_gzipped(self):
+        """Test that large bodies are gzipped when the client accepts it"""
+        content = [{"id": i, "address": "123 Main St"} for i in range(COMPRESSION_MIN_BYTES)]
+        response = json_response(_request("gzip, deflate"), content)
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert json.loads(gzip.decompress(response.body)) == content
+
+    def test_large_payload_without_accept_encoding(self):
+        """Test that compression is only applied when negotiated"""
+        content = [{"id": i} for i in range(COMPRESSION_MIN_BYTES)]
+        response = json_response(_request(), content)
+        assert json.loads(response.body) == content
+
+    def test_refused_codings_are_not_used(self):
+        """Test that q=0 refuses a coding"""
+        content = [{"id": i} for i in range(COMPRESSION_MIN_BYTES)]
+        response = json_response(_request("gzip;q=0, br;q=0"), content)
+        assert "content-encoding" not in response.headers
+        assert json.loads(response.body) == content
+
+    def test_pick_encoding_honours_q_values(self, monkeypatch):
+        """Test that the highest-q supported coding wins"""
+        monkeypatch.setattr(responses, "brotli", object())
+        assert _pick_encoding("br;q=0.5, gzip") == "gzip"
+        assert _pick_encoding("br, gzip;q=1.0") == "br"
+        assert _pick_encoding("br;q=0, gzip;q=0.1") == "gzip"
+        assert _pick_encoding("*;q=0.3, br;q=0") == "gzip"
+        assert _pick_encoding("identity") is None
+
+        monkeypatch.setattr(responses, "brotli", None)
+        assert _pick_encoding("br") is None
@@ -0,0 +1,153 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from . import main
+from .logic import analyze_listing
+from .models import GlobalAssumptions, MapProperty
+from .snapshot import (
+    Snapshot,
+    SnapshotFormatError,
+    SnapshotReader,
+    SnapshotRebuilder,
+    write_snapshot,
+)
+
+
+@pytest.fixture(scope="module")
+def listings(sample_rows):
+    return [MapProperty.model_validate(row) for row in sample_rows]
+
+
+class TestSnapshot:
+    """Test suite for the memory-mapped scored-listings snapshot"""
+
+    def test_zip_lookup_round_trips(self, tmp_path, listings):
+        """Test that rows for a ZIP come back with their derived scores"""
+        path = tmp_path / "listings.snap"
+        write_snapshot(path, listings, version=7)
+        snapshot = Snapshot(path)
+
+        listing = listings[0]
+        rows = snapshot.rows_for_zip(listing.zipCode)
+        row = next(row for row in rows if row["id"] == listing.id)
+
+        assert snapshot.version == 7
+        assert snapshot.rows == len(listings)
+        assert len(rows) == sum(1 for item in listings if item.zipCode == listing.zipCode)
+        assert MapProperty.model_validate(row) == listing
+        assert row["overallScore"] == analyze_listing(listing, GlobalAssumptions()).overallScore
+
+    def test_columns_are_views_over_the_mapping(self, tmp_path, listings):
+        """Test that numeric columns are zero-copy memoryviews"""
+        path = tmp_path / "listings.snap"
+        write_snapshot(path, listings)
+        prices = Snapshot(path).column("listPrice")
+
+        assert isinstance(prices, memoryview)
+        assert sorted(prices) == sorted(item.listPrice for item in listings)
+
+    def test_reader_picks_up_rebuilt_snapshot(self, tmp_path, listings):
+        """Test that an atomic rebuild is seen without reopening the reader"""
+        path = tmp_path / "listings.snap"
+        write_snapshot(path, listings[:10], version=1)
+        reader = SnapshotReader(path, check_interval=0)
+        old = reader.current()
+
+        write_snapshot(path, listings, version=2)
+        new = reader.current()
+
+        assert (old.version, old.rows) == (1, 10)
+        assert (new.version, new.rows) == (2, len(listings))
+        assert old.rows_for_zip(listings[0].zipCode) is not None
+        assert [name for name in os.listdir(tmp_path)] == ["listings.snap"]
+
+    def test_rejects_foreign_files(self, tmp_path):
+        """Test that non-snapshot files are refused"""
+        path = tmp_path / "listings.snap"
+        path.write_bytes(b"\x00" * 64)
+        with pytest.raises(SnapshotFormatError):
+            Snapshot(path)
+
+    @pytest.mark.parametrize("keep", [10, 200, 0.6, 0.99])
+    def test_rejects_truncated_files(self, tmp_path, listings, keep):
+        """Test that a file cut short is refused instead of failing on access"""
+        path = tmp_path / "listings.snap"
+        write_snapshot(path, listings)
+        data = path.read_bytes()
+        path.write_bytes(data[: keep if isinstance(keep, int) else int(len(data) * keep)])
+        with pytest.raises(SnapshotFormatError):
+            Snapshot(path)
+
+    def test_reader_keeps_serving_after_bad_rebuild(self, tmp_path, listings):
+        """Test that a corrupt or empty replacement leaves the old mapping in use"""
+        path = tmp_path / "listings.snap"
+        write_snapshot(path, listings, version=1)
+        reader = SnapshotReader(path, check_interval=0)
+        assert reader.current().version == 1
+
+        path.unlink()
+        path.write_bytes(b"")
+        assert reader.current().version == 1
+
+
+class TestSnapshotRebuilder:
+    """Test suite for rebuilding the snapshot after listings change"""
+
+    def test_burst_of_requests_rebuilds_once(self, tmp_path, listings_collection, sample_rows):
+        """Test that requests are debounced into a single rebuild"""
+        listings_collection.insert_many([dict(row) for row in sample_rows[:30]])
+        path = tmp_path / "listings.snap"
+        rebuilder = SnapshotRebuilder(listings_collection, path, debounce=0.05)
+        rebuilds = []
+        original = rebuilder.rebuild
+        rebuilder.rebuild = lambda since_ns: rebuilds.append(original(since_ns))
+        rebuilder.start()
+        try:
+            for _ in range(5):
+                rebuilder.request({"operationType": "update"})
+            deadline = time.monotonic() + 5
+            while not rebuilds and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.1)
+        finally:
+            rebuilder.stop()
+
+        assert len(rebuilds) == 1
+        assert Snapshot(path).rows == 30
+
+    def test_skips_when_snapshot_already_covers_changes(self, tmp_path, listings_collection, sample_rows):
+        """Test that a worker does not redo a rebuild another worker started later"""
+        listings_collection.insert_many([dict(row) for row in sample_rows[:30]])
+        path = tmp_path / "listings.snap"
+        rebuilder = SnapshotRebuilder(listings_collection, path)
+        since_ns = time.time_ns()
+        version = rebuilder.rebuild()
+
+        assert version > since_ns
+        assert rebuilder.rebuild(since_ns) is None
+        assert rebuilder.rebuild(version + 1) is not None
+
+
+class TestScoredListingsEndpoint:
+    """Test suite for /api/scored-listings/{zip_code}"""
+
+    def test_serves_from_snapshot(self, tmp_path, listings, monkeypatch):
+        """Test that the endpoint answers from the mapped snapshot"""
+        path = tmp_path / "listings.snap"
+        write_snapshot(path, listings, version=3)
+        monkeypatch.setattr(main, "snapshot_reader", SnapshotReader(path))
+        client = TestClient(main.app)
+
+        body = client.get(f"/api/scored-listings/{listings[0].zipCode}").json()
+        assert body["version"] == 3
+        assert 0 <= body["ageSeconds"] < 60
+        assert listings[0].id in {row["id"] for row in body["results"]}
+
+    def test_missing_snapshot_is_503(self, monkeypatch):
+        """Test that workers without a snapshot say so"""
+        monkeypatch.setattr(main, "snapshot_reader", None)
+        response = TestClient(main.app).get("/api/scored-listings/02118")
+        assert response.status_code == 503
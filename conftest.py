@@ -1,11 +1,48 @@
+import json
+import os
+from pathlib import Path
+
 import pytest
 
+# MongoClient connects lazily, so importing backend.main only needs a URI.
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+SAMPLE_LISTINGS = Path(__file__).resolve().parent / "data" / "sample-listings.json"
+
 @pytest.fixture(scope='session')
 def setup_database():
     # Code to set up the database connection
     yield
     # Code to tear down the database connection
 
+@pytest.fixture
+def listings_collection(monkeypatch):
+    """An in-memory listings collection backed by mongomock."""
+    mongomock = pytest.importorskip("mongomock")
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo 4.11 passes ``sort`` to bulk update builders; mongomock 4.3 predates it.
+    for name in ("add_update", "add_replace"):
+        original = getattr(BulkOperationBuilder, name)
+
+        def _without_sort(self, *args, _original=original, sort=None, **kwargs):
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(BulkOperationBuilder, name, _without_sort)
+    return mongomock.MongoClient().db.listings
+
+
+@pytest.fixture(scope="session")
+def sample_listings_path():
+    return SAMPLE_LISTINGS
+
+
+@pytest.fixture(scope="session")
+def sample_rows():
+    """The bundled sample listings as raw documents; copy before mutating."""
+    return json.loads(SAMPLE_LISTINGS.read_text())
+
+
 @pytest.fixture
 def sample_data():
     return {"key": "value"}
\ No newline at end of file
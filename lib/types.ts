@@ -55,6 +55,14 @@ export type AgentCommentary = {
   keyBullets: string[];
 };
 
+// Comparable-listings rent estimate with its 95% range
+export type RentEstimate = {
+  estimatedRent: number;
+  low: number;
+  high: number;
+  compIds: string[];
+};
+
 // Full result for each property
 export type PropertyAnalysisResult = {
   property: PropertyInput;
@@ -62,6 +70,7 @@ export type PropertyAnalysisResult = {
   timeline: YearProjection[];
   commentary: AgentCommentary;
   overallScore: number;
+  rentEstimate?: RentEstimate | null; // set when a blank rent was filled from comps
 };
 
 // Global assumptions